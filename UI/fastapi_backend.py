@@ -5,7 +5,8 @@ Handles API requests from the HTML frontend
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Dict, Any
 import json
@@ -14,8 +15,15 @@ from datetime import datetime
 import io
 
 # Import your existing modules
-from rag_backend import get_rag_response, generate_checklist
-from utils import extract_programs_from_conversation, get_quick_replies
+from rag_backend import get_rag_response, get_rag_response_stream, generate_checklist, SemanticResponseCache
+
+# Repeated questions (e.g. the landing-page quick starts) can be answered from
+# a semantic cache instead of a full RAG call. Opt-in because it needs
+# sentence-transformers and keys on the prompt alone.
+if os.getenv("BENEFITSFLOW_SEMANTIC_CACHE") == "1":
+    rag_response = SemanticResponseCache(get_rag_response, threshold=0.95)
+else:
+    rag_response = get_rag_response
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -51,7 +59,7 @@ class DownloadRequest(BaseModel):
 # API Endpoints
 
 @app.get("/")
-async def root():
+async def root() -> Dict[str, str]:
     """Health check endpoint"""
     return {"message": "BenefitsFlow API is running!", "status": "healthy"}
 
@@ -64,7 +72,9 @@ async def chat_endpoint(request: ChatRequest):
     try:
         # For now, use demo responses
         # TODO: Replace with Deric's RAG system when ready
-        response_text, sources, programs = get_rag_response(
+        # Blocking (semantic cache model load / encode): keep it off the event loop
+        response_text, sources, programs = await run_in_threadpool(
+            rag_response,
             request.message, 
             request.conversation_history, 
             {"situation": request.situation}
@@ -79,6 +89,27 @@ async def chat_endpoint(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming chat endpoint - sends the response as newline-delimited JSON events
+    ({"delta": ...} pieces of text, then {"sources": ..., "programs": ...})
+    """
+    def events():
+        for event in get_rag_response_stream(
+            request.message,
+            request.conversation_history,
+            {"situation": request.situation}
+        ):
+            if 'sources' in event:
+                event = {
+                    'sources': [dict(source) for source in event['sources']],
+                    'programs': list(event['programs'])
+                }
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.post("/download/checklist")
 async def download_checklist(request: DownloadRequest):
     """
@@ -86,10 +117,12 @@ async def download_checklist(request: DownloadRequest):
     """
     try:
         # Generate checklist using your existing logic
-        checklist_data = generate_checklist(
+        # Items are shared read-only templates; copy them so the dump below
+        # shows plain dicts
+        checklist_data = [dict(item) for item in generate_checklist(
             request.conversation_history,
             request.situation
-        )
+        )]
         
         # Create a simple text file (in production, use a PDF library)
         content = f"""BenefitsFlow Personalized Checklist
@@ -184,7 +217,7 @@ END:VCALENDAR"""
         raise HTTPException(status_code=500, detail=f"Error generating calendar: {str(e)}")
 
 @app.get("/situations")
-async def get_situations():
+async def get_situations() -> Dict[str, List[Dict[str, str]]]:
     """
     Get available situation types
     """
@@ -200,7 +233,7 @@ async def get_situations():
     }
 
 @app.get("/health")
-async def health_check():
+async def health_check() -> Dict[str, str]:
     """
     Health check endpoint
     """
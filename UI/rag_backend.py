@@ -3,15 +3,29 @@ RAG Backend Integration for BenefitsFlow
 Handles retrieval-augmented generation for California benefits information.
 """
 
-import json
-import random
-from typing import List, Dict, Any, Tuple
-from datetime import datetime
-
-# Sample responses for demo purposes - in production, this would connect to your vector DB
-SAMPLE_RESPONSES = {
-    'job_loss': {
-        'text': """I understand losing your job is stressful. Let me help you find the support you need. In California, you may be eligible for:
+import re
+import threading
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Tuple, Callable, Iterator
+
+try:
+    import numpy as np
+except ImportError:  # only needed by SemanticResponseCache
+    np = None
+
+# Sample responses for demo purposes - in production, this would connect to your vector DB.
+# Stored column-wise: one tuple per field (text, sources, programs), indexed by Category.
+class Category(IntEnum):
+    JOB_LOSS = 0
+    HEALTHCARE = 1
+    FOOD_ASSISTANCE = 2
+    HOUSING = 3
+    CASH_ASSISTANCE = 4
+    DEFAULT = 5
+
+JOB_LOSS_TEXT = """I understand losing your job is stressful. Let me help you find the support you need. In California, you may be eligible for:
 
 **Unemployment Insurance (UI)**
 • Weekly payments while you look for work
@@ -32,17 +46,9 @@ SAMPLE_RESPONSES = {
 • Free skills training and career services
 • Available through local workforce development boards
 
-Which of these would you like to know more about?""",
-        'sources': [
-            {'name': 'EDD California', 'url': 'https://edd.ca.gov', 'date': 'Oct 2025'},
-            {'name': 'CalFresh', 'url': 'https://calfresh.ca.gov', 'date': 'Oct 2025'},
-            {'name': 'DHCS', 'url': 'https://dhcs.ca.gov', 'date': 'Oct 2025'}
-        ],
-        'programs': ['Unemployment Insurance', 'CalFresh', 'Medi-Cal', 'Job Training']
-    },
-    
-    'healthcare': {
-        'text': """California offers several healthcare options to help you get coverage:
+Which of these would you like to know more about?"""
+
+HEALTHCARE_TEXT = """California offers several healthcare options to help you get coverage:
 
 **Medi-Cal**
 • Free or low-cost health coverage for low-income individuals
@@ -66,17 +72,9 @@ Which of these would you like to know more about?""",
 • No-cost pregnancy-related services
 • Available through Medi-Cal or local health departments
 
-Would you like help checking your eligibility for any of these programs?""",
-        'sources': [
-            {'name': 'DHCS', 'url': 'https://dhcs.ca.gov', 'date': 'Oct 2025'},
-            {'name': 'Covered California', 'url': 'https://coveredca.com', 'date': 'Oct 2025'},
-            {'name': 'BenefitsCal', 'url': 'https://benefitscal.com', 'date': 'Oct 2025'}
-        ],
-        'programs': ['Medi-Cal', 'Covered California', 'Emergency Medi-Cal']
-    },
-    
-    'food_assistance': {
-        'text': """CalFresh (formerly food stamps) helps families buy nutritious food. Here's what you need to know:
+Would you like help checking your eligibility for any of these programs?"""
+
+FOOD_ASSISTANCE_TEXT = """CalFresh (formerly food stamps) helps families buy nutritious food. Here's what you need to know:
 
 **Benefits**
 • Monthly benefits loaded onto an EBT card
@@ -102,17 +100,9 @@ Would you like help checking your eligibility for any of these programs?""",
 • EBT card mailed to your address
 • Benefits renew every 6-12 months
 
-Would you like help determining if you're eligible or need assistance with the application?""",
-        'sources': [
-            {'name': 'CalFresh', 'url': 'https://calfresh.ca.gov', 'date': 'Oct 2025'},
-            {'name': 'BenefitsCal', 'url': 'https://benefitscal.com', 'date': 'Oct 2025'},
-            {'name': 'CDSS', 'url': 'https://cdss.ca.gov', 'date': 'Oct 2025'}
-        ],
-        'programs': ['CalFresh']
-    },
-    
-    'housing': {
-        'text': """California has several housing assistance programs to help with different situations:
+Would you like help determining if you're eligible or need assistance with the application?"""
+
+HOUSING_TEXT = """California has several housing assistance programs to help with different situations:
 
 **Section 8 Housing Choice Vouchers**
 • Helps pay rent in private housing
@@ -144,17 +134,9 @@ Would you like help determining if you're eligible or need assistance with the a
 3. Need help with rent payments?
 4. Looking for affordable housing options?
 
-Let me know your situation so I can provide more specific guidance.""",
-        'sources': [
-            {'name': 'HUD', 'url': 'https://hud.gov', 'date': 'Oct 2025'},
-            {'name': 'California Housing', 'url': 'https://hcd.ca.gov', 'date': 'Oct 2025'},
-            {'name': '211 California', 'url': 'https://211california.org', 'date': 'Oct 2025'}
-        ],
-        'programs': ['Section 8', 'Emergency Housing', 'Rent Relief', 'Homeless Services']
-    },
-    
-    'cash_assistance': {
-        'text': """CalWORKs provides temporary cash assistance and employment services to eligible families:
+Let me know your situation so I can provide more specific guidance."""
+
+CASH_ASSISTANCE_TEXT = """CalWORKs provides temporary cash assistance and employment services to eligible families:
 
 **Cash Benefits**
 • Monthly cash payments to help with basic needs
@@ -185,16 +167,9 @@ Let me know your situation so I can provide more specific guidance.""",
 • In-person at your local county office
 • Application includes interview and verification
 
-Would you like more information about eligibility or the application process?""",
-        'sources': [
-            {'name': 'CDSS', 'url': 'https://cdss.ca.gov', 'date': 'Oct 2025'},
-            {'name': 'BenefitsCal', 'url': 'https://benefitscal.com', 'date': 'Oct 2025'}
-        ],
-        'programs': ['CalWORKs']
-    },
-    
-    'default': {
-        'text': """I'm here to help you navigate California's public benefits. I can provide information about:
+Would you like more information about eligibility or the application process?"""
+
+DEFAULT_TEXT = """I'm here to help you navigate California's public benefits. I can provide information about:
 
 **Food Assistance**
 • CalFresh (food stamps) - monthly benefits for groceries
@@ -222,16 +197,155 @@ Would you like more information about eligibility or the application process?"""
 • Child care assistance
 • Energy assistance (LIHEAP)
 
-What situation are you facing? I can provide more specific information and help you understand your options.""",
-        'sources': [
-            {'name': 'BenefitsCal', 'url': 'https://benefitscal.com', 'date': 'Oct 2025'},
-            {'name': 'CDSS', 'url': 'https://cdss.ca.gov', 'date': 'Oct 2025'}
-        ],
-        'programs': []
-    }
+What situation are you facing? I can provide more specific information and help you understand your options."""
+
+RESPONSE_TEXTS = (JOB_LOSS_TEXT, HEALTHCARE_TEXT, FOOD_ASSISTANCE_TEXT, HOUSING_TEXT, CASH_ASSISTANCE_TEXT, DEFAULT_TEXT)
+
+# Each source is built once and shared by every category that cites it; they are
+# handed straight to callers, so they are read-only
+_SOURCES = {
+    source['name']: MappingProxyType(source) for source in (
+        {'name': 'EDD California', 'url': 'https://edd.ca.gov', 'date': 'Oct 2025'},
+        {'name': 'CalFresh', 'url': 'https://calfresh.ca.gov', 'date': 'Oct 2025'},
+        {'name': 'DHCS', 'url': 'https://dhcs.ca.gov', 'date': 'Oct 2025'},
+        {'name': 'Covered California', 'url': 'https://coveredca.com', 'date': 'Oct 2025'},
+        {'name': 'BenefitsCal', 'url': 'https://benefitscal.com', 'date': 'Oct 2025'},
+        {'name': 'CDSS', 'url': 'https://cdss.ca.gov', 'date': 'Oct 2025'},
+        {'name': 'HUD', 'url': 'https://hud.gov', 'date': 'Oct 2025'},
+        {'name': 'California Housing', 'url': 'https://hcd.ca.gov', 'date': 'Oct 2025'},
+        {'name': '211 California', 'url': 'https://211california.org', 'date': 'Oct 2025'},
+    )
 }
 
-def get_rag_response(prompt: str, conversation_history: List[Dict], user_context: Dict) -> Tuple[str, List[Dict], List[str]]:
+RESPONSE_SOURCES = (
+    (_SOURCES['EDD California'], _SOURCES['CalFresh'], _SOURCES['DHCS']),  # JOB_LOSS
+    (_SOURCES['DHCS'], _SOURCES['Covered California'], _SOURCES['BenefitsCal']),  # HEALTHCARE
+    (_SOURCES['CalFresh'], _SOURCES['BenefitsCal'], _SOURCES['CDSS']),  # FOOD_ASSISTANCE
+    (_SOURCES['HUD'], _SOURCES['California Housing'], _SOURCES['211 California']),  # HOUSING
+    (_SOURCES['CDSS'], _SOURCES['BenefitsCal']),  # CASH_ASSISTANCE
+    (_SOURCES['BenefitsCal'], _SOURCES['CDSS']),  # DEFAULT
+)
+
+RESPONSE_PROGRAMS = (
+    ('Unemployment Insurance', 'CalFresh', 'Medi-Cal', 'Job Training'),  # JOB_LOSS
+    ('Medi-Cal', 'Covered California', 'Emergency Medi-Cal'),  # HEALTHCARE
+    ('CalFresh',),  # FOOD_ASSISTANCE
+    ('Section 8', 'Emergency Housing', 'Rent Relief', 'Homeless Services'),  # HOUSING
+    ('CalWORKs',),  # CASH_ASSISTANCE
+    (),  # DEFAULT
+)
+
+# Keyword groups used by the demo classifiers below. Every group owns one bit,
+# so a single scan of the text answers all of the "does it mention ..." checks
+# made by get_rag_response, generate_checklist and extract_programs_from_conversation.
+KEYWORD_GROUPS = (
+    # get_rag_response categories (checked in this priority order)
+    ('job_loss', ('job', 'unemployment', 'lost', 'fired', 'laid off', 'work')),
+    ('healthcare', ('health', 'medical', 'medi-cal', 'insurance', 'doctor', 'hospital')),
+    ('food_assistance', ('food', 'calfresh', 'hungry', 'groceries', 'eat')),
+    ('housing', ('housing', 'rent', 'homeless', 'shelter', 'eviction')),
+    ('cash_assistance', ('cash', 'money', 'calworks', 'benefits', 'assistance')),
+    # Narrower lists used for checklist items and situation extraction
+    ('job_core', ('job', 'unemployment', 'lost', 'fired')),
+    ('health_core', ('health', 'medical', 'medi-cal')),
+    ('health_checklist', ('health', 'medical', 'medi-cal', 'insurance')),
+    ('food_core', ('food', 'calfresh', 'hungry')),
+    ('food_checklist', ('food', 'calfresh', 'hungry', 'groceries')),
+    ('housing_core', ('housing', 'rent', 'homeless')),
+    ('housing_checklist', ('housing', 'rent', 'homeless', 'shelter')),
+    # Documents and deadlines mentioned in the conversation
+    ('doc_income', ('income', 'pay')),
+    ('doc_id', ('id', 'license')),
+    ('doc_residence', ('address', 'residence')),
+    ('deadline_week', ('week',)),
+    ('deadline_month', ('30 days', 'month')),
+)
+
+KEYWORD_BITS = {name: 1 << i for i, (name, _) in enumerate(KEYWORD_GROUPS)}
+ALL_KEYWORD_BITS = (1 << len(KEYWORD_GROUPS)) - 1
+
+RESPONSE_PRIORITY = (
+    (KEYWORD_BITS['job_loss'], Category.JOB_LOSS),
+    (KEYWORD_BITS['healthcare'], Category.HEALTHCARE),
+    (KEYWORD_BITS['food_assistance'], Category.FOOD_ASSISTANCE),
+    (KEYWORD_BITS['housing'], Category.HOUSING),
+    (KEYWORD_BITS['cash_assistance'], Category.CASH_ASSISTANCE),
+)
+
+# The response groups come first in KEYWORD_GROUPS, so their bits are the low
+# bits of a scan mask; the priority order above is resolved once here for every
+# combination of them
+RESPONSE_BITS = (1 << len(RESPONSE_PRIORITY)) - 1
+CATEGORY_BY_MASK = tuple(
+    next((cat for bit, cat in RESPONSE_PRIORITY if mask & bit), Category.DEFAULT)
+    for mask in range(RESPONSE_BITS + 1)
+)
+
+def _build_keyword_scanner():
+    """Compile every keyword into one pattern plus a keyword -> bitmask table."""
+    keywords = {kw for _, group in KEYWORD_GROUPS for kw in group}
+    masks = {}
+    for kw in keywords:
+        # A keyword also implies every keyword it contains ('health' contains 'eat'),
+        # which keeps the single scan equivalent to independent substring checks.
+        mask = 0
+        for name, group in KEYWORD_GROUPS:
+            if any(other in kw for other in group):
+                mask |= KEYWORD_BITS[name]
+        masks[kw] = mask
+    # Longest alternatives first so the match at each position is the one that
+    # contains all others starting there; the lookahead lets matches overlap.
+    alternation = '|'.join(re.escape(kw) for kw in sorted(keywords, key=lambda kw: (-len(kw), kw)))
+    return re.compile(f'(?=({alternation}))'), masks
+
+_KEYWORD_PATTERN, _KEYWORD_MASKS = _build_keyword_scanner()
+
+def scan_keywords(text_lower: str, stop_bits: int = 0) -> int:
+    """
+    Scan lowercased text once and return the bitmask of keyword groups it mentions.
+    
+    Args:
+        text_lower: Lowercased text to scan
+        stop_bits: Stop scanning as soon as any of these bits is found
+    
+    Returns:
+        Bitmask of KEYWORD_BITS for every group with a keyword present in the text
+        (only the groups seen so far if the scan stopped early)
+    """
+    mask = 0
+    for match in _KEYWORD_PATTERN.finditer(text_lower):
+        mask |= _KEYWORD_MASKS[match.group(1)]
+        if mask & stop_bits:
+            break
+    return mask
+
+@lru_cache(maxsize=32)
+def _scan_messages(contents_lower: Tuple[str, ...]) -> int:
+    mask = 0
+    for content_lower in contents_lower:
+        mask |= scan_keywords(content_lower)
+        if mask == ALL_KEYWORD_BITS:
+            break
+    return mask
+
+def scan_conversation(conversation_history: List[Dict]) -> int:
+    """
+    Return the keyword bitmask for a whole conversation.
+    
+    Messages are scanned one at a time, so the history is never joined into a
+    single string, and scanning stops once every keyword group has been seen.
+    Results are memoized on the lowercased message contents, so generate_checklist
+    and extract_programs_from_conversation share one scan per conversation state.
+    
+    Args:
+        conversation_history: List of messages in the conversation
+    
+    Returns:
+        Bitmask of KEYWORD_BITS mentioned anywhere in the conversation
+    """
+    return _scan_messages(tuple(msg['content'].lower() for msg in conversation_history))
+
+def get_rag_response(prompt: str, conversation_history: List[Dict], user_context: Dict) -> Tuple[str, Tuple[Dict, ...], Tuple[str, ...]]:
     """
     Get RAG response based on user prompt and conversation history.
     
@@ -252,22 +366,130 @@ def get_rag_response(prompt: str, conversation_history: List[Dict], user_context
     # For demo purposes, we'll use keyword matching
     prompt_lower = prompt.lower()
     
-    # Determine response category based on keywords
-    if any(keyword in prompt_lower for keyword in ['job', 'unemployment', 'lost', 'fired', 'laid off', 'work']):
-        response_data = SAMPLE_RESPONSES['job_loss']
-    elif any(keyword in prompt_lower for keyword in ['health', 'medical', 'medi-cal', 'insurance', 'doctor', 'hospital']):
-        response_data = SAMPLE_RESPONSES['healthcare']
-    elif any(keyword in prompt_lower for keyword in ['food', 'calfresh', 'hungry', 'groceries', 'eat']):
-        response_data = SAMPLE_RESPONSES['food_assistance']
-    elif any(keyword in prompt_lower for keyword in ['housing', 'rent', 'homeless', 'shelter', 'eviction']):
-        response_data = SAMPLE_RESPONSES['housing']
-    elif any(keyword in prompt_lower for keyword in ['cash', 'money', 'calworks', 'benefits', 'assistance']):
-        response_data = SAMPLE_RESPONSES['cash_assistance']
-    else:
-        response_data = SAMPLE_RESPONSES['default']
-    
-    return response_data['text'], response_data['sources'], response_data['programs']
+    # Determine response category based on keywords; nothing outranks the
+    # first priority group, so the scan can stop once it is found
+    mask = scan_keywords(prompt_lower, RESPONSE_PRIORITY[0][0])
+    category = CATEGORY_BY_MASK[mask & RESPONSE_BITS]
+    
+    return RESPONSE_TEXTS[category], RESPONSE_SOURCES[category], RESPONSE_PROGRAMS[category]
 
+def get_rag_response_stream(prompt: str, conversation_history: List[Dict], user_context: Dict) -> Iterator[Dict]:
+    """
+    Stream a RAG response so the client can show text before the answer is complete.
+    
+    Args:
+        prompt: User's current message
+        conversation_history: List of previous messages
+        user_context: Extracted user context from conversation
+    
+    Yields:
+        {'delta': str} events with consecutive pieces of the response text, then one
+        final {'sources': ..., 'programs': ...} event
+    """
+    # In production, the deltas would be forwarded from the LLM's token stream.
+    # The demo response is already complete, so send it a paragraph at a time
+    response_text, sources, programs = get_rag_response(prompt, conversation_history, user_context)
+    paragraphs = response_text.split('\n\n')
+    for i, paragraph in enumerate(paragraphs):
+        yield {'delta': paragraph if i == len(paragraphs) - 1 else paragraph + '\n\n'}
+    yield {'sources': sources, 'programs': programs}
+
+# Checklist templates shared by every generate_checklist call. They are read-only:
+# copy an item with dict(item) before modifying it.
+DOCUMENTS_ITEM = MappingProxyType({
+    'title': 'Gather Required Documents',
+    'description': 'Collect these documents before applying for benefits:',
+    'details': (
+        'Proof of income (pay stubs from last 30 days)',
+        'Photo ID (Driver\'s License or State ID)',
+        'Proof of residence (utility bill or lease)',
+        'Social Security numbers for all household members',
+        'Bank statements (if required)',
+        'Birth certificates for children (if applicable)'
+    ),
+    'deadline': 'Before starting applications',
+    'type': 'Documents',
+    'priority': 'high'
+})
+
+UNEMPLOYMENT_ITEM = MappingProxyType({
+    'title': 'Apply for Unemployment Insurance',
+    'description': 'File your UI claim as soon as possible after job loss:',
+    'details': (
+        'Visit EDD.ca.gov to file online (fastest method)',
+        'Or call 1-800-300-5616 to file by phone',
+        'Have employment history and last employer information ready',
+        'File within the first week of unemployment for full benefits',
+        'Complete weekly certification to receive payments'
+    ),
+    'deadline': 'Within 1 week of job loss',
+    'type': 'Action',
+    'priority': 'high',
+    'link': 'https://edd.ca.gov'
+})
+
+CALFRESH_ITEM = MappingProxyType({
+    'title': 'Submit CalFresh Application',
+    'description': 'Apply for food assistance benefits:',
+    'details': (
+        'Complete online application at BenefitsCal.com',
+        'Or visit your local county office in person',
+        'Interview will be scheduled within 10 days',
+        'Benefits typically arrive within 30 days',
+        'Keep receipts for any work-related expenses'
+    ),
+    'deadline': 'Apply as soon as possible',
+    'type': 'Action',
+    'priority': 'high',
+    'link': 'https://benefitscal.com'
+})
+
+MEDI_CAL_ITEM = MappingProxyType({
+    'title': 'Check Medi-Cal Eligibility',
+    'description': 'See if you qualify for health coverage:',
+    'details': (
+        'Use online eligibility calculator at BenefitsCal.com',
+        'Based on household size and monthly income',
+        'Coverage can start the same month if eligible',
+        'No waiting period for most people',
+        'Apply even if you think you might not qualify'
+    ),
+    'deadline': 'Check within 15 days',
+    'type': 'Check',
+    'priority': 'medium',
+    'link': 'https://benefitscal.com'
+})
+
+HOUSING_ITEM = MappingProxyType({
+    'title': 'Contact Housing Resources',
+    'description': 'Get help with housing needs:',
+    'details': (
+        'Call 211 for local housing resources',
+        'Contact your county housing authority',
+        'Check for emergency shelter availability',
+        'Apply for Section 8 if waitlist is open',
+        'Document any housing-related expenses'
+    ),
+    'deadline': 'Contact within 24-48 hours if urgent',
+    'type': 'Action',
+    'priority': 'high',
+    'link': 'https://211california.org'
+})
+
+FOLLOW_UP_ITEM = MappingProxyType({
+    'title': 'Follow Up on Applications',
+    'description': 'Stay on top of your benefit applications:',
+    'details': (
+        'Check application status regularly',
+        'Respond to any requests for additional information',
+        'Keep copies of all submitted documents',
+        'Note important dates and deadlines',
+        'Contact caseworkers if you have questions'
+    ),
+    'deadline': 'Ongoing',
+    'type': 'Follow-up',
+    'priority': 'medium'
+})
 def generate_checklist(conversation_history: List[Dict], user_context: Dict) -> List[Dict]:
     """
     Generate a personalized checklist based on conversation history.
@@ -277,118 +499,32 @@ def generate_checklist(conversation_history: List[Dict], user_context: Dict) ->
         user_context: Extracted context about user's situation
     
     Returns:
-        List of checklist items
+        List of checklist items (shared read-only mappings, see DOCUMENTS_ITEM)
     """
     # In production, this would use AI to analyze the conversation
     # and generate personalized action items
     
     # For demo, we'll generate a generic checklist based on common scenarios
-    checklist_items = []
-    
     # Always include document gathering
-    checklist_items.append({
-        'title': 'Gather Required Documents',
-        'description': 'Collect these documents before applying for benefits:',
-        'details': [
-            'Proof of income (pay stubs from last 30 days)',
-            'Photo ID (Driver\'s License or State ID)',
-            'Proof of residence (utility bill or lease)',
-            'Social Security numbers for all household members',
-            'Bank statements (if required)',
-            'Birth certificates for children (if applicable)'
-        ],
-        'deadline': 'Before starting applications',
-        'type': 'Documents',
-        'priority': 'high'
-    })
+    checklist_items = [DOCUMENTS_ITEM]
     
     # Add program-specific items based on conversation
-    conversation_text = ' '.join([msg['content'] for msg in conversation_history])
-    conversation_lower = conversation_text.lower()
-    
-    if any(keyword in conversation_lower for keyword in ['job', 'unemployment', 'lost', 'fired']):
-        checklist_items.append({
-            'title': 'Apply for Unemployment Insurance',
-            'description': 'File your UI claim as soon as possible after job loss:',
-            'details': [
-                'Visit EDD.ca.gov to file online (fastest method)',
-                'Or call 1-800-300-5616 to file by phone',
-                'Have employment history and last employer information ready',
-                'File within the first week of unemployment for full benefits',
-                'Complete weekly certification to receive payments'
-            ],
-            'deadline': 'Within 1 week of job loss',
-            'type': 'Action',
-            'priority': 'high',
-            'link': 'https://edd.ca.gov'
-        })
-    
-    if any(keyword in conversation_lower for keyword in ['food', 'calfresh', 'hungry', 'groceries']):
-        checklist_items.append({
-            'title': 'Submit CalFresh Application',
-            'description': 'Apply for food assistance benefits:',
-            'details': [
-                'Complete online application at BenefitsCal.com',
-                'Or visit your local county office in person',
-                'Interview will be scheduled within 10 days',
-                'Benefits typically arrive within 30 days',
-                'Keep receipts for any work-related expenses'
-            ],
-            'deadline': 'Apply as soon as possible',
-            'type': 'Action',
-            'priority': 'high',
-            'link': 'https://benefitscal.com'
-        })
-    
-    if any(keyword in conversation_lower for keyword in ['health', 'medical', 'medi-cal', 'insurance']):
-        checklist_items.append({
-            'title': 'Check Medi-Cal Eligibility',
-            'description': 'See if you qualify for health coverage:',
-            'details': [
-                'Use online eligibility calculator at BenefitsCal.com',
-                'Based on household size and monthly income',
-                'Coverage can start the same month if eligible',
-                'No waiting period for most people',
-                'Apply even if you think you might not qualify'
-            ],
-            'deadline': 'Check within 15 days',
-            'type': 'Check',
-            'priority': 'medium',
-            'link': 'https://benefitscal.com'
-        })
-    
-    if any(keyword in conversation_lower for keyword in ['housing', 'rent', 'homeless', 'shelter']):
-        checklist_items.append({
-            'title': 'Contact Housing Resources',
-            'description': 'Get help with housing needs:',
-            'details': [
-                'Call 211 for local housing resources',
-                'Contact your county housing authority',
-                'Check for emergency shelter availability',
-                'Apply for Section 8 if waitlist is open',
-                'Document any housing-related expenses'
-            ],
-            'deadline': 'Contact within 24-48 hours if urgent',
-            'type': 'Action',
-            'priority': 'high',
-            'link': 'https://211california.org'
-        })
+    mask = scan_conversation(conversation_history)
+    
+    if mask & KEYWORD_BITS['job_core']:
+        checklist_items.append(UNEMPLOYMENT_ITEM)
+    
+    if mask & KEYWORD_BITS['food_checklist']:
+        checklist_items.append(CALFRESH_ITEM)
+    
+    if mask & KEYWORD_BITS['health_checklist']:
+        checklist_items.append(MEDI_CAL_ITEM)
+    
+    if mask & KEYWORD_BITS['housing_checklist']:
+        checklist_items.append(HOUSING_ITEM)
     
     # Add follow-up items
-    checklist_items.append({
-        'title': 'Follow Up on Applications',
-        'description': 'Stay on top of your benefit applications:',
-        'details': [
-            'Check application status regularly',
-            'Respond to any requests for additional information',
-            'Keep copies of all submitted documents',
-            'Note important dates and deadlines',
-            'Contact caseworkers if you have questions'
-        ],
-        'deadline': 'Ongoing',
-        'type': 'Follow-up',
-        'priority': 'medium'
-    })
+    checklist_items.append(FOLLOW_UP_ITEM)
     
     return checklist_items
 
@@ -405,8 +541,7 @@ def extract_programs_from_conversation(conversation_history: List[Dict]) -> Dict
     # In production, this would use NLP to extract structured information
     # For demo, we'll do simple keyword matching
     
-    conversation_text = ' '.join([msg['content'] for msg in conversation_history])
-    conversation_lower = conversation_text.lower()
+    mask = scan_conversation(conversation_history)
     
     context = {
         'situation': None,
@@ -416,31 +551,120 @@ def extract_programs_from_conversation(conversation_history: List[Dict]) -> Dict
     }
     
     # Determine situation
-    if any(keyword in conversation_lower for keyword in ['job', 'unemployment', 'lost', 'fired']):
+    if mask & KEYWORD_BITS['job_core']:
         context['situation'] = 'job_loss'
         context['programs_eligible'].extend(['Unemployment Insurance', 'CalFresh', 'Medi-Cal'])
-    elif any(keyword in conversation_lower for keyword in ['health', 'medical', 'medi-cal']):
+    elif mask & KEYWORD_BITS['health_core']:
         context['situation'] = 'healthcare'
         context['programs_eligible'].extend(['Medi-Cal', 'Covered California'])
-    elif any(keyword in conversation_lower for keyword in ['food', 'calfresh', 'hungry']):
+    elif mask & KEYWORD_BITS['food_core']:
         context['situation'] = 'food_assistance'
         context['programs_eligible'].append('CalFresh')
-    elif any(keyword in conversation_lower for keyword in ['housing', 'rent', 'homeless']):
+    elif mask & KEYWORD_BITS['housing_core']:
         context['situation'] = 'housing'
         context['programs_eligible'].extend(['Section 8', 'Emergency Housing'])
     
     # Extract documents mentioned
-    if 'income' in conversation_lower or 'pay' in conversation_lower:
+    if mask & KEYWORD_BITS['doc_income']:
         context['documents_needed'].append('Proof of income')
-    if 'id' in conversation_lower or 'license' in conversation_lower:
+    if mask & KEYWORD_BITS['doc_id']:
         context['documents_needed'].append('Photo ID')
-    if 'address' in conversation_lower or 'residence' in conversation_lower:
+    if mask & KEYWORD_BITS['doc_residence']:
         context['documents_needed'].append('Proof of residence')
     
     # Extract deadlines
-    if 'week' in conversation_lower:
+    if mask & KEYWORD_BITS['deadline_week']:
         context['deadlines'].append('File unemployment within 1 week')
-    if '30 days' in conversation_lower or 'month' in conversation_lower:
+    if mask & KEYWORD_BITS['deadline_month']:
         context['deadlines'].append('Benefits typically start within 30 days')
     
     return context
+
+class SemanticResponseCache:
+    """
+    Semantic cache in front of a RAG response function.
+    
+    Prompts are embedded with a sentence-transformers model. When a new prompt is
+    close enough to a cached one (cosine similarity >= threshold), the cached
+    (response_text, sources, programs) tuple is returned without calling the
+    wrapped function. Once full, the least recently used entry is overwritten.
+    With quantize=True cached embeddings are stored as int8 plus a per-row
+    scale, cutting their memory 4x for large caches. Thread-safe.
+    
+    Usage:
+        cached_rag_response = SemanticResponseCache(get_rag_response)
+        response_text, sources, programs = cached_rag_response(prompt, history, user_context)
+    """
+    
+    def __init__(self, response_fn: Callable[..., Tuple[str, List[Dict], List[str]]],
+                 model_name: str = 'all-MiniLM-L6-v2', threshold: float = 0.85,
+                 max_entries: int = 1024, quantize: bool = False):
+        if np is None:
+            raise RuntimeError("SemanticResponseCache requires numpy")
+        self.response_fn = response_fn
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.quantize = quantize
+        self._model = None
+        self._embeddings = None  # (max_entries, dim) float32 (int8 if quantized), rows are L2-normalized
+        self._scales = None  # (max_entries,) float32 dequantization scale per row, only when quantized
+        self._responses: List[Tuple[str, List[Dict], List[str]]] = []
+        self._last_used: List[int] = []
+        self._clock = 0
+        self._lock = threading.Lock()
+    
+    def _embed(self, text: str):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    # Imported lazily so the demo backend starts without loading torch
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(text, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+    
+    def _lookup(self, embedding) -> int:
+        """Return the slot of the most similar cached prompt, or -1 on a miss."""
+        if not self._responses:
+            return -1
+        count = len(self._responses)
+        scores = self._embeddings[:count] @ embedding
+        if self.quantize:
+            scores *= self._scales[:count]
+        best = int(np.argmax(scores))
+        return best if scores[best] >= self.threshold else -1
+    
+    def _store(self, embedding, response: Tuple[str, List[Dict], List[str]]) -> None:
+        if self._embeddings is None:
+            dtype = np.int8 if self.quantize else np.float32
+            self._embeddings = np.empty((self.max_entries, embedding.shape[0]), dtype=dtype)
+            if self.quantize:
+                self._scales = np.empty(self.max_entries, dtype=np.float32)
+        if len(self._responses) < self.max_entries:
+            slot = len(self._responses)
+            self._responses.append(response)
+            self._last_used.append(self._clock)
+        else:
+            slot = int(np.argmin(self._last_used))
+            self._responses[slot] = response
+            self._last_used[slot] = self._clock
+        if self.quantize:
+            scale = float(np.abs(embedding).max()) / 127 or 1.0
+            self._embeddings[slot] = np.round(embedding / scale).astype(np.int8)
+            self._scales[slot] = scale
+        else:
+            self._embeddings[slot] = embedding
+    
+    def __call__(self, prompt: str, conversation_history: List[Dict], user_context: Dict) -> Tuple[str, List[Dict], List[str]]:
+        embedding = self._embed(prompt)
+        with self._lock:
+            self._clock += 1
+            slot = self._lookup(embedding)
+            if slot >= 0:
+                self._last_used[slot] = self._clock
+                return self._responses[slot]
+        response = self.response_fn(prompt, conversation_history, user_context)
+        with self._lock:
+            self._clock += 1
+            self._store(embedding, response)
+        return response
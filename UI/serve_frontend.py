@@ -4,13 +4,15 @@ BenefitsFlow - Properly Hosted Frontend + Backend
 Serves the HTML frontend through FastAPI with proper hosting
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import hashlib
 import os
 from pathlib import Path
+from typing import Dict
 
 # Import your existing backend
 from fastapi_backend import app as backend_app
@@ -38,13 +40,27 @@ app.mount("/api", backend_app)
 # Serve static files (images, CSS, etc.)
 app.mount("/static", StaticFiles(directory="."), name="static")
 
+# The page is read once at startup and served from memory; the ETag lets
+# browsers revalidate with a 304 instead of downloading it again
+INDEX_HTML = (Path(__file__).parent / "benefitsflow_frontend.html").read_bytes()
+STYLESHEET = Path(__file__).parent / "benefitsflow_frontend.css"
+INDEX_ETAG = f'"{hashlib.md5(INDEX_HTML).hexdigest()}"'
+INDEX_HEADERS = {"ETag": INDEX_ETAG, "Cache-Control": "public, max-age=300"}
+
 @app.get("/")
-async def serve_frontend():
+async def serve_frontend(request: Request):
     """Serve the main HTML frontend"""
-    return FileResponse("benefitsflow_frontend.html")
+    if request.headers.get("if-none-match") == INDEX_ETAG:
+        return Response(status_code=304, headers=INDEX_HEADERS)
+    return Response(INDEX_HTML, media_type="text/html", headers=INDEX_HEADERS)
+
+@app.get("/benefitsflow_frontend.css")
+async def serve_stylesheet():
+    """Serve the frontend stylesheet (cached by the browser between page loads)"""
+    return FileResponse(STYLESHEET, headers={"Cache-Control": "public, max-age=3600"})
 
 @app.get("/health")
-async def health_check():
+async def health_check() -> Dict[str, str]:
     """Health check endpoint"""
     return {"status": "healthy", "message": "BenefitsFlow is running!"}
 
@@ -55,4 +71,7 @@ if __name__ == "__main__":
     print("API Documentation: http://localhost:8000/api/docs")
     print("\nApplication is now properly hosted and ready for use.")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # One worker process per CPU (override with WEB_CONCURRENCY); uvicorn picks
+    # uvloop and httptools automatically when they are installed
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    uvicorn.run("serve_frontend:app", host="0.0.0.0", port=8000, workers=workers)
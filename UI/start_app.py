@@ -4,14 +4,69 @@ BenefitsFlow HTML + FastAPI Startup Script
 Starts the FastAPI backend and opens the HTML frontend
 """
 
+import hashlib
 import subprocess
 import os
 import sys
 import webbrowser
 import time
 import threading
+import urllib.request
 from pathlib import Path
 
+# Hash of the interpreter + requirements.txt of the last successful install
+DEPS_STAMP = Path.home() / ".cache" / "benefitsflow" / "deps.sha256"
+
+def install_dependencies():
+    """
+    pip install requirements.txt, skipping the install when the file's hash
+    matches the one recorded after the last successful install into this
+    interpreter (a new venv or Python always installs).
+    """
+    digest = hashlib.sha256(f"{sys.prefix}\0{sys.executable}\0".encode())
+    digest.update(Path("requirements.txt").read_bytes())
+    requirements_hash = digest.hexdigest()
+    if DEPS_STAMP.exists() and DEPS_STAMP.read_text() == requirements_hash:
+        print("Dependencies up to date.")
+        return
+    
+    print("Installing/updating dependencies...")
+    try:
+        subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
+                      check=True, capture_output=True)
+        print("Dependencies verified.")
+    except subprocess.CalledProcessError as e:
+        print(f"WARNING: Could not install dependencies: {e}")
+        return
+    
+    try:
+        DEPS_STAMP.parent.mkdir(parents=True, exist_ok=True)
+        DEPS_STAMP.write_text(requirements_hash)
+    except OSError as e:
+        print(f"WARNING: Could not record dependency stamp: {e}")
+
+def wait_for_backend(url, process, timeout=15.0):
+    """
+    Poll the backend health endpoint with exponential backoff.
+    
+    Returns True as soon as it answers 200, False if the process exits or
+    the timeout passes first.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while process.poll() is None:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    return False
+
 def main():
     print("Starting BenefitsFlow HTML + FastAPI Application...")
     
@@ -28,35 +83,19 @@ def main():
         print("ERROR: fastapi_backend.py not found!")
         return
     
-    # Install dependencies if not already installed
-    print("Installing/updating dependencies...")
-    try:
-        subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
-                      check=True, capture_output=True)
-        print("Dependencies verified.")
-    except subprocess.CalledProcessError as e:
-        print(f"WARNING: Could not install dependencies: {e}")
+    # Install dependencies unless requirements.txt is unchanged since the last install
+    install_dependencies()
     
     # Start FastAPI backend in a separate process
     print("Starting FastAPI backend...")
     try:
         backend_process = subprocess.Popen([sys.executable, "fastapi_backend.py"])
         
-        # Give FastAPI a moment to start
-        time.sleep(3)
-        
-        # Check if backend is running
-        try:
-            import requests
-            response = requests.get("http://localhost:8000/health", timeout=5)
-            if response.status_code == 200:
-                print("FastAPI backend is running successfully.")
-            else:
-                print("WARNING: FastAPI backend may not be responding properly")
-        except ImportError:
-            print("WARNING: requests not available - cannot verify backend status")
-        except Exception as e:
-            print(f"WARNING: Could not verify backend status: {e}")
+        # Wait until the backend answers its health check
+        if wait_for_backend("http://localhost:8000/health", backend_process):
+            print("FastAPI backend is running successfully.")
+        else:
+            print("WARNING: FastAPI backend may not be responding properly")
         
     except Exception as e:
         print(f"ERROR starting FastAPI backend: {e}")
@@ -2,12 +2,58 @@
 Utility functions for BenefitsFlow
 """
 
-from typing import List, Dict, Any
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Any, Tuple
+
+# Situation keywords in priority order; the first situation with a keyword in the
+# conversation wins. Built once at import instead of on every call.
+JOB_LOSS_KEYWORDS = frozenset(('job', 'unemployment', 'lost', 'fired'))
+HEALTHCARE_KEYWORDS = frozenset(('health', 'medical', 'medi-cal'))
+FOOD_ASSISTANCE_KEYWORDS = frozenset(('food', 'calfresh', 'hungry'))
+HOUSING_KEYWORDS = frozenset(('housing', 'rent', 'homeless'))
+
+SITUATION_RULES = (
+    ('job_loss', JOB_LOSS_KEYWORDS, ('Unemployment Insurance', 'CalFresh', 'Medi-Cal')),
+    ('healthcare', HEALTHCARE_KEYWORDS, ('Medi-Cal', 'Covered California')),
+    ('food_assistance', FOOD_ASSISTANCE_KEYWORDS, ('CalFresh',)),
+    ('housing', HOUSING_KEYWORDS, ('Section 8', 'Emergency Housing')),
+)
+
+def _build_situation_pattern():
+    """Compile every situation keyword into one pattern plus a keyword -> rule index table."""
+    keywords = {kw for _, group, _ in SITUATION_RULES for kw in group}
+    # A keyword also counts for every rule with a keyword it contains, which keeps
+    # the single scan equivalent to independent substring checks.
+    ranks = {
+        kw: min(i for i, (_, group, _) in enumerate(SITUATION_RULES) if any(other in kw for other in group))
+        for kw in keywords
+    }
+    # Longest alternatives first; the lookahead lets matches overlap.
+    alternation = '|'.join(re.escape(kw) for kw in sorted(keywords, key=lambda kw: (-len(kw), kw)))
+    return re.compile(f'(?=({alternation}))'), ranks
+
+_SITUATION_PATTERN, _SITUATION_RANKS = _build_situation_pattern()
+
+@lru_cache(maxsize=256)
+def _situation_rule(contents: Tuple[str, ...]) -> int:
+    """Index into SITUATION_RULES for a conversation, or len(SITUATION_RULES) if none match."""
+    conversation_lower = ' '.join(contents).lower()
+    best = len(SITUATION_RULES)
+    for match in _SITUATION_PATTERN.finditer(conversation_lower):
+        best = min(best, _SITUATION_RANKS[match.group(1)])
+        if best == 0:
+            break
+    return best
 
 def extract_programs_from_conversation(conversation_history: List[Dict]) -> Dict:
     """
     Extract program information and user context from conversation.
     
+    The keyword scan is memoized on the message contents, so repeated calls for
+    the same conversation skip it; a fresh context dict is returned every time.
+    
     Args:
         conversation_history: List of messages in the conversation
     
@@ -15,8 +61,7 @@ def extract_programs_from_conversation(conversation_history: List[Dict]) -> Dict
         Dictionary with extracted context
     """
     # Simple keyword extraction for demo
-    conversation_text = ' '.join([msg.get('content', '') for msg in conversation_history])
-    conversation_lower = conversation_text.lower()
+    best = _situation_rule(tuple(msg.get('content', '') for msg in conversation_history))
     
     context = {
         'situation': None,
@@ -25,23 +70,44 @@ def extract_programs_from_conversation(conversation_history: List[Dict]) -> Dict
         'deadlines': []
     }
     
-    # Determine situation
-    if any(keyword in conversation_lower for keyword in ['job', 'unemployment', 'lost', 'fired']):
-        context['situation'] = 'job_loss'
-        context['programs_eligible'].extend(['Unemployment Insurance', 'CalFresh', 'Medi-Cal'])
-    elif any(keyword in conversation_lower for keyword in ['health', 'medical', 'medi-cal']):
-        context['situation'] = 'healthcare'
-        context['programs_eligible'].extend(['Medi-Cal', 'Covered California'])
-    elif any(keyword in conversation_lower for keyword in ['food', 'calfresh', 'hungry']):
-        context['situation'] = 'food_assistance'
-        context['programs_eligible'].append('CalFresh')
-    elif any(keyword in conversation_lower for keyword in ['housing', 'rent', 'homeless']):
-        context['situation'] = 'housing'
-        context['programs_eligible'].extend(['Section 8', 'Emergency Housing'])
+    # Determine situation from the highest-priority rule seen
+    if best < len(SITUATION_RULES):
+        situation, _, programs = SITUATION_RULES[best]
+        context['situation'] = situation
+        context['programs_eligible'].extend(programs)
     
     return context
 
-def get_quick_replies(situation: str) -> List[str]:
+QUICK_REPLIES = MappingProxyType({
+    'job_loss': (
+        'Tell me about UI benefits',
+        'How do I apply for CalFresh?',
+        'What documents do I need?'
+    ),
+    'healthcare': (
+        'Check Medi-Cal eligibility',
+        'What does Medi-Cal cover?',
+        'How to apply?'
+    ),
+    'food_assistance': (
+        'Check eligibility',
+        'How much can I get?',
+        'Where can I apply?'
+    ),
+    'housing': (
+        'Risk of eviction',
+        'Currently homeless',
+        'Need rent help'
+    ),
+    'default': (
+        'I lost my job',
+        'Need healthcare',
+        'Need food assistance',
+        'Housing help'
+    )
+})
+
+def get_quick_replies(situation: str) -> Tuple[str, ...]:
     """
     Get quick reply suggestions based on situation.
     
@@ -49,35 +115,6 @@ def get_quick_replies(situation: str) -> List[str]:
         situation: User's current situation
     
     Returns:
-        List of quick reply suggestions
+        Tuple of quick reply suggestions (shared, read-only)
     """
-    quick_replies = {
-        'job_loss': [
-            'Tell me about UI benefits',
-            'How do I apply for CalFresh?',
-            'What documents do I need?'
-        ],
-        'healthcare': [
-            'Check Medi-Cal eligibility',
-            'What does Medi-Cal cover?',
-            'How to apply?'
-        ],
-        'food_assistance': [
-            'Check eligibility',
-            'How much can I get?',
-            'Where can I apply?'
-        ],
-        'housing': [
-            'Risk of eviction',
-            'Currently homeless',
-            'Need rent help'
-        ],
-        'default': [
-            'I lost my job',
-            'Need healthcare',
-            'Need food assistance',
-            'Housing help'
-        ]
-    }
-    
-    return quick_replies.get(situation, quick_replies['default'])
\ No newline at end of file
+    return QUICK_REPLIES.get(situation, QUICK_REPLIES['default'])
@@ -1,5 +1,5 @@
 # Initialize
-# import boto3
+import boto3
 import sagemaker
 from sagemaker import get_execution_role
 from sagemaker.jumpstart.model import JumpStartModel
@@ -14,10 +14,35 @@ role = get_execution_role()
 bucket = sagemaker_session.default_bucket()
 prefix = "AI-Anti-Poverty-Assistant/data"
 
-# sm = boto3.client("sagemaker")
+sm = boto3.client("sagemaker")
+
+# Deploy once and keep the endpoint up; 03_rag_query only invokes it by name
+ENDPOINT_NAME = "ai-anti-poverty-llama-3-1-70b"
 
 # Create JS endpoint
 js_model = JumpStartModel(model_id="meta-textgeneration-llama-3-1-70b-instruct", role=sagemaker_session.get_caller_identity_arn())
-predictor = js_model.deploy(instance_type="ml.g5.2xlarge", initial_instance_count=1)
+predictor = js_model.deploy(instance_type="ml.g5.2xlarge", initial_instance_count=1, endpoint_name=ENDPOINT_NAME)
 JUMPSTART_ENDPOINT = predictor.endpoint_name
 
+def delete_endpoint(name=ENDPOINT_NAME):
+    """Tear down the endpoint, its config and model when it is no longer needed.
+
+    The config and model names are looked up from the endpoint because the
+    SDK gives the model a generated name, not the endpoint's.
+    """
+    config, models = name, []
+    try:
+        config = sm.describe_endpoint(EndpointName=name)["EndpointConfigName"]
+        variants = sm.describe_endpoint_config(EndpointConfigName=config)["ProductionVariants"]
+        models = [v["ModelName"] for v in variants]
+    except Exception as e:
+        print("Warning during cleanup:", e)
+    deletes = [lambda: sm.delete_endpoint(EndpointName=name),
+               lambda: sm.delete_endpoint_config(EndpointConfigName=config)]
+    deletes += [lambda m=m: sm.delete_model(ModelName=m) for m in models]
+    for delete in deletes:
+        try:
+            delete()
+        except Exception as e:
+            print("Warning during cleanup:", e)
+
@@ -1,11 +1,16 @@
 # !pip install boto3 faiss-cpu sentence-transformers pypdf python-docx chardet --quiet
 import os, io, json, tempfile, unicodedata, chardet
 import boto3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from pypdf import PdfReader
 from docx import Document as DocxDocument
 from sentence_transformers import SentenceTransformer
 import faiss
+try:
+    from model2vec import StaticModel
+except ImportError:  # STATIC_EMBED_MODEL needs model2vec
+    StaticModel = None
 
 s3 = boto3.client("s3")
 
@@ -13,6 +18,7 @@ BUCKET = ""
 PREFIX = "rag/raw"          # where the raw docs live
 INDEX_PREFIX = "rag/index"  # where to write the FAISS index + metadata
 EMBED_MODEL_NAME = ""  # swap if you prefer
+STATIC_EMBED_MODEL = ""  # model2vec static embedder; set the same value in 03_rag_query
 
 def s3_list_objects(bucket, prefix):
     paginator = s3.get_paginator("list_objects_v2")
@@ -74,14 +80,22 @@ for key in s3_list_objects(BUCKET, PREFIX):
 print(f"Collected {len(docs)} chunks")
 
 # 2) Embed
-model = SentenceTransformer(EMBED_MODEL_NAME)
-embs = model.encode([d["text"] for d in docs], batch_size=64, show_progress_bar=True, normalize_embeddings=True)
 import numpy as np
+if STATIC_EMBED_MODEL:
+    embs = StaticModel.from_pretrained(STATIC_EMBED_MODEL).encode([d["text"] for d in docs], show_progress_bar=True)
+    embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+else:
+    model = SentenceTransformer(EMBED_MODEL_NAME)
+    embs = model.encode([d["text"] for d in docs], batch_size=64, show_progress_bar=True, normalize_embeddings=True)
 embs = np.array(embs, dtype="float32")
 
 # 3) FAISS index
 d = embs.shape[1]
-index = faiss.IndexFlatIP(d)     # cosine if normalized
+# HNSW graph: sublinear search instead of a linear scan (inner product = cosine if normalized).
+# Vectors are stored as 8-bit scalar-quantized codes: 4x fewer bytes to scan and download
+index = faiss.IndexHNSWSQ(d, faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT)
+index.hnsw.efConstruction = 40
+index.train(embs)
 index.add(embs)
 print("Index size:", index.ntotal)
 
@@ -90,7 +104,7 @@ with tempfile.TemporaryDirectory() as td:
     idx_path = Path(td) / "faiss.index"
     faiss.write_index(index, str(idx_path))
     meta = {
-        "embedding_model": EMBED_MODEL_NAME,
+        "embedding_model": STATIC_EMBED_MODEL or EMBED_MODEL_NAME,
         "dimension": d,
         "count": len(docs),
         "docs": [{"s3_key": d["s3_key"], "text": d["text"][:500]} for d in docs]  # truncate texts in metadata
@@ -98,8 +112,10 @@ with tempfile.TemporaryDirectory() as td:
     meta_path = Path(td) / "meta.json"
     meta_path.write_text(json.dumps(meta))
 
-    # 5) Upload to S3
-    s3.upload_file(str(idx_path), BUCKET, f"{INDEX_PREFIX}/faiss.index")
-    s3.upload_file(str(meta_path), BUCKET, f"{INDEX_PREFIX}/meta.json")
+    # 5) Upload to S3 (both files at once)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for fut in [pool.submit(s3.upload_file, str(idx_path), BUCKET, f"{INDEX_PREFIX}/faiss.index"),
+                    pool.submit(s3.upload_file, str(meta_path), BUCKET, f"{INDEX_PREFIX}/meta.json")]:
+            fut.result()
 
 print("Index and metadata uploaded to s3://{}/{}".format(BUCKET, INDEX_PREFIX))
@@ -1,93 +1,230 @@
 # !pip install boto3 faiss-cpu sentence-transformers --quiet
+import os
+# One OpenMP/MKL thread per core for FAISS and the CPU embedder (read when they load)
+os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count() or 1))
+os.environ.setdefault("MKL_NUM_THREADS", str(os.cpu_count() or 1))
 import json
-import tempfile
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import numpy as np
 import faiss
+faiss.omp_set_num_threads(os.cpu_count() or 1)
+import torch
+torch.set_num_threads(os.cpu_count() or 1)
+try:
+    torch.set_num_interop_threads(2)
+except RuntimeError:  # already set / interop work started (cell re-run in the same kernel)
+    pass
 import boto3
 from pathlib import Path
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from sentence_transformers import SentenceTransformer
-from sagemaker.jumpstart.model import JumpStartModel
-import sagemaker
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+except ImportError:  # EMBED_ONNX needs optimum[onnxruntime]
+    ORTModelForFeatureExtraction = None
+try:
+    from model2vec import StaticModel
+except ImportError:  # STATIC_EMBED_MODEL needs model2vec
+    StaticModel = None
+try:
+    import orjson
+except ImportError:  # falls back to the json module
+    orjson = None
+try:
+    from usearch.index import search as usearch_search, MetricKind, BatchMatches
+except ImportError:  # USEARCH_EXACT needs usearch
+    usearch_search = None
 
 BUCKET = ""
 INDEX_PREFIX = "rag/index"
 EMBED_MODEL_NAME = ""
-MODEL_ID = "meta-textgeneration-llama-3-1-70b-instruct"
-INSTANCE_TYPE = "ml.c5.large"
-ENDPOINT_NAME = ""
+ENDPOINT_NAME = "ai-anti-poverty-llama-3-1-70b"  # deployed once by 01_deploy_model, reused by every query
+MAX_NEW_TOKENS = 512
+EMBED_BF16 = False  # bfloat16 weights: only faster on hardware with native bf16 (not ml.c5)
+EMBED_ONNX = False  # embed with ONNX Runtime instead of PyTorch (mean-pooling models, e.g. MiniLM)
+HNSW_EF_SEARCH = 16  # HNSW candidate list size per query (recall vs. speed)
+# Index files over 8 MB download as up to 16 parallel ranged GETs
+INDEX_TRANSFER = TransferConfig(multipart_threshold=8 * 1024 * 1024, max_concurrency=16, use_threads=True)
+# Downloaded indexes persist here across runs; only the latest ETag of each S3 key is kept
+INDEX_CACHE_DIR = Path(os.getenv("RAG_INDEX_CACHE", Path.home() / ".cache" / "rag_index"))
+# Brute-force top-k with USearch's SIMD kernels instead of the FAISS graph (small/medium corpora).
+# Scans the vectors decoded from the SQ8 index, so scores carry the 8-bit quantization error
+USEARCH_EXACT = False
+STATIC_EMBED_MODEL = ""  # model2vec static embedder (sub-ms queries); the index must be built with the same one
 
 # --- utility: load index and metadata ---
+_gpu_res = None  # GPU scratch memory, kept alive as long as the GPU index using it
+_exact_vectors = None  # (N, d) float32 vectors decoded from the index, only with USEARCH_EXACT
+
+def to_gpu(index):
+    """Copy the index to GPU 0 once, when faiss-gpu sees a GPU; else return it unchanged."""
+    global _gpu_res
+    if getattr(faiss, "get_num_gpus", lambda: 0)() == 0:
+        return index
+    _gpu_res = faiss.StandardGpuResources()
+    return faiss.index_cpu_to_gpu(_gpu_res, 0, index)
+
+def download_index(s3, bucket, key):
+    """Local path of the index, downloaded only when this S3 version is not cached yet.
+    Older cached versions of the same S3 key are deleted."""
+    etag = s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+    stem = hashlib.sha256(f"{bucket}/{key}".encode()).hexdigest()[:16]
+    path = INDEX_CACHE_DIR / f"{stem}-{etag}.index"
+    if not path.exists():
+        INDEX_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        part = path.with_suffix(".part")
+        s3.download_file(bucket, key, str(part), Config=INDEX_TRANSFER)
+        part.replace(path)
+    for old in INDEX_CACHE_DIR.glob(f"{stem}-*.index"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path
+
 def load_index(bucket, prefix):
-    s3 = boto3.client("s3")
-    with tempfile.TemporaryDirectory() as td:
-        s3.download_file(bucket, f"{prefix}/faiss.index", f"{td}/faiss.index")
-        s3.download_file(bucket, f"{prefix}/meta.json", f"{td}/meta.json")
-        index = faiss.read_index(f"{td}/faiss.index")
-        meta = json.loads(Path(f"{td}/meta.json").read_text())
+    global _exact_vectors
+    # pool sized for the parallel ranged GETs of INDEX_TRANSFER
+    s3 = boto3.client("s3", config=Config(max_pool_connections=32))
+    # Fetch both objects in parallel; meta.json is parsed while the larger
+    # index is still downloading (or found in the local cache)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        index_fut = pool.submit(download_index, s3, bucket, f"{prefix}/faiss.index")
+        meta_fut = pool.submit(lambda: json.loads(s3.get_object(Bucket=bucket, Key=f"{prefix}/meta.json")["Body"].read()))
+        index_path, meta = index_fut.result(), meta_fut.result()
+    index = faiss.read_index(str(index_path))
+    # object array of the doc dicts, so retrieve gathers hits with one fancy index
+    meta["docs_array"] = np.empty(len(meta["docs"]), dtype=object)
+    meta["docs_array"][:] = meta["docs"]
+    if USEARCH_EXACT and usearch_search is not None:
+        _exact_vectors = index.reconstruct_n(0, index.ntotal)
+    hnsw = faiss.downcast_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        hnsw.hnsw.efSearch = HNSW_EF_SEARCH
+    else:  # faiss has no GPU HNSW; flat indexes go to the GPU when there is one
+        index = to_gpu(index)
     return index, meta
 
+@lru_cache(maxsize=1)
+def _get_model(name, bf16=False):
+    # Loading weights takes seconds; load once and reuse for every query
+    kwargs = {"model_kwargs": {"torch_dtype": torch.bfloat16}} if bf16 else {}
+    return SentenceTransformer(name, **kwargs)
+
+@lru_cache(maxsize=1)
+def _get_onnx_model(name):
+    # Exported to ONNX once per process, run with one intra-op thread per core
+    opts = onnxruntime.SessionOptions()
+    opts.intra_op_num_threads = os.cpu_count() or 1
+    model = ORTModelForFeatureExtraction.from_pretrained(name, export=True, session_options=opts)
+    return AutoTokenizer.from_pretrained(name), model
+
+def embed_queries_onnx(qs):
+    tok, model = _get_onnx_model(EMBED_MODEL_NAME)
+    enc = tok(qs, padding=True, truncation=True, return_tensors="np")
+    hidden = model(**enc).last_hidden_state
+    # mean pool over real tokens, then L2-normalize (same as the SentenceTransformer)
+    mask = enc["attention_mask"][..., None].astype("float32")
+    v = (hidden * mask).sum(axis=1) / mask.sum(axis=1)
+    v = v.astype(np.float32, copy=False)
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    return v
+
+@lru_cache(maxsize=1)
+def _get_static_model(name):
+    return StaticModel.from_pretrained(name)
+
+def embed_queries_static(qs):
+    # token embedding lookup + mean pool, no transformer layers
+    v = _get_static_model(STATIC_EMBED_MODEL).encode(qs)
+    v = v.astype(np.float32, copy=False)
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    return v
+
+def embed_queries(qs):
+    """(len(qs), d) float32 L2-normalized embeddings: all queries are tokenized in
+    one tokenizer call and embedded in one forward pass."""
+    if STATIC_EMBED_MODEL:
+        return embed_queries_static(qs)
+    if EMBED_ONNX and ORTModelForFeatureExtraction is not None:
+        return embed_queries_onnx(qs)
+    m = _get_model(EMBED_MODEL_NAME, EMBED_BF16)
+    enc = m.tokenizer(qs, padding=True, truncation=True, max_length=m.max_seq_length, return_tensors="pt")
+    with torch.inference_mode():
+        v = m(dict(enc.to(m.device)))["sentence_embedding"]
+    # upcast the pooled vector to fp32 before L2 normalization
+    v = torch.nn.functional.normalize(v.float(), dim=-1)
+    return v.cpu().numpy()  # already float32; shares the tensor's memory
+
 def embed_query(q):
-    m = SentenceTransformer(EMBED_MODEL_NAME)
-    v = m.encode([q], normalize_embeddings=True)
-    return np.array(v, dtype="float32")
+    return embed_queries([q])
+
+def retrieve_batch(qvecs, index, meta, k=5):
+    """Top-k docs for every row of qvecs (B, d) with one index.search call.
+    FAISS only spreads work over threads when it gets several queries at once."""
+    if _exact_vectors is not None:
+        found = usearch_search(_exact_vectors, qvecs, k, MetricKind.IP, exact=True)
+        if isinstance(found, BatchMatches):
+            I = [row[:n] for row, n in zip(found.keys, found.counts)]
+        else:  # a single query row comes back as plain Matches
+            I = [found.keys]
+    else:
+        D, I = index.search(qvecs, k)
+    docs = meta["docs_array"]
+    return [docs[row[row >= 0]].tolist() for row in I]
 
 def retrieve(qvec, index, meta, k=5):
-    D, I = index.search(qvec, k)
-    return [meta["docs"][int(i)] for i in I[0] if i >= 0]
+    return retrieve_batch(qvec, index, meta, k)[0]
 
-def build_prompt(query, contexts):
-    context_block = "\n\n".join([f"[Source {i+1}] {c['text']}" for i, c in enumerate(contexts)])
-    return f"""You are a helpful assistant. Use the CONTEXT below to answer the QUESTION.
-            If the answer is not found in the context, say "I don't know."
+# Prompt pieces without the source indentation, which was sent as extra input tokens
+_PROMPT_HEADER = (
+    "You are a helpful assistant. Use the CONTEXT below to answer the QUESTION.\n"
+    "If the answer is not found in the context, say \"I don't know.\"\n"
+    "\n"
+    "CONTEXT:\n"
+)
+_PROMPT_TAIL = "\n\nQUESTION: "
 
-            CONTEXT:
-            {context_block}
+@lru_cache(maxsize=16)
+def _prompt_template(k):
+    """str.format of the whole prompt with k positional source slots and {q}, built once per k."""
+    sources = "\n\n".join(f"[Source {i}] {{{i - 1}}}" for i in range(1, k + 1))
+    return "".join((_PROMPT_HEADER.replace("{", "{{").replace("}", "}}"), sources, _PROMPT_TAIL, "{q}\n")).format
 
-            QUESTION: {query}
-            """
+def build_prompt(query, contexts):
+    return _prompt_template(len(contexts))(*[c["text"] for c in contexts], q=query)
+
+def call_jumpstart(prompt):
+    payload = {"inputs": prompt, "parameters": {"max_new_tokens": MAX_NEW_TOKENS}}
+    resp = rt_client.invoke_endpoint(
+        EndpointName=ENDPOINT_NAME,
+        ContentType="application/json",
+        Body=orjson.dumps(payload) if orjson else json.dumps(payload),
+    )
+    # both parsers take the raw bytes, no decode step
+    body = resp["Body"].read()
+    return orjson.loads(body) if orjson else json.loads(body)
 
-# --- run query with auto-cleanup ---
-session = sagemaker.Session()
-role = sagemaker.get_execution_role()
-sm_client = boto3.client("sagemaker")
-rt_client = boto3.client("sagemaker-runtime")
+# --- run query against the already-deployed endpoint ---
+# One client shared by every call (and thread): pooled keep-alive connections,
+# adaptive retries on throttling
+rt_client = boto3.client(
+    "sagemaker-runtime",
+    config=Config(max_pool_connections=64, tcp_keepalive=True, retries={"max_attempts": 3, "mode": "adaptive"}),
+)
 
 index, meta = load_index(BUCKET, INDEX_PREFIX)
 query = "Summarize the main topics discussed in the uploaded documents."
 
-predictor = None
-try:
-    print("🚀 Deploying JumpStart model...")
-    js_model = JumpStartModel(model_id=MODEL_ID, role=role)
-    predictor = js_model.deploy(
-        initial_instance_count=1,
-        instance_type=INSTANCE_TYPE,
-        endpoint_name=ENDPOINT_NAME
-    )
+print("🔍 Retrieving context...")
+qvec = embed_query(query)
+ctx = retrieve(qvec, index, meta, k=5)
+prompt = build_prompt(query, ctx)
 
-    print("🔍 Retrieving context...")
-    qvec = embed_query(query)
-    ctx = retrieve(qvec, index, meta, k=5)
-    prompt = build_prompt(query, ctx)
-
-    print("💬 Sending prompt to endpoint...")
-    response = predictor.predict(prompt)
-    print("\n--- MODEL RESPONSE ---\n")
-    print(response)
-
-finally:
-    # cleanup: delete endpoint, config, and model
-    print("\n🧹 Cleaning up resources...")
-    if predictor:
-        try:
-            predictor.delete_endpoint(delete_endpoint_config=True)
-        except Exception as e:
-            print("Warning deleting endpoint via predictor:", e)
-    for name in [ENDPOINT_NAME]:
-        try: sm_client.delete_model(ModelName=name)
-        except Exception: pass
-        try: sm_client.delete_endpoint_config(EndpointConfigName=name)
-        except Exception: pass
-        try: sm_client.delete_endpoint(EndpointName=name)
-        except Exception: pass
-    print("✅ Cleanup complete.")
+print("💬 Sending prompt to endpoint...")
+response = call_jumpstart(prompt)
+print("\n--- MODEL RESPONSE ---\n")
+print(response)
@@ -1,69 +1,129 @@
 import os
 import json
+import time
 import boto3
+from botocore.exceptions import ClientError
 from functools import lru_cache
 
+# Secret payloads are cached for this long so rotated secrets are still picked up
+SECRET_CACHE_TTL = int(os.getenv("SECRET_CACHE_TTL", "3600"))
+_secret_cache: dict[tuple[str, str], tuple[float, str]] = {}
+
 def _get_env(name: str, default: str | None = None) -> str | None:
     v = os.getenv(name, default)
     return v
 
+@lru_cache(maxsize=4)
+def _sm_client(region: str):
+    """One Secrets Manager client per region, shared by every lookup."""
+    return boto3.client("secretsmanager", region_name=region)
+
 def _resolve_secret_value(secret_id_or_arn: str, region: str | None = None) -> str:
     """Fetch secret string from AWS Secrets Manager.
     Accepts either a full ARN or a name; uses provided region or BEDROCK_REGION/S3_REGION as fallback.
+    Values are cached for SECRET_CACHE_TTL seconds.
     """
     if not region:
         region = os.getenv("BEDROCK_REGION") or os.getenv("S3_REGION") or "us-west-2"
-    sm = boto3.client("secretsmanager", region_name=region)
-    resp = sm.get_secret_value(SecretId=secret_id_or_arn)
+    key = (secret_id_or_arn, region)
+    cached = _secret_cache.get(key)
+    if cached and time.monotonic() - cached[0] < SECRET_CACHE_TTL:
+        return cached[1]
+    resp = _sm_client(region).get_secret_value(SecretId=secret_id_or_arn)
+    val = _secret_payload(resp)
+    _secret_cache[key] = (time.monotonic(), val)
+    return val
+
+def _secret_payload(resp: dict) -> str:
     if "SecretString" in resp:
         return resp["SecretString"]
     # If binary, decode
     import base64
     return base64.b64decode(resp["SecretBinary"]).decode("utf-8")
 
-@lru_cache(maxsize=4)
+def prefetch_secrets(names: list[str], region: str | None = None) -> dict[str, str]:
+    """Fetch several secrets with one BatchGetSecretValue call and seed the cache.
+    Anything the batch call did not return (or an older botocore / role without it) falls
+    back to _resolve_secret_value, so the result always covers every name.
+    """
+    if not region:
+        region = os.getenv("BEDROCK_REGION") or os.getenv("S3_REGION") or "us-west-2"
+    now = time.monotonic()
+    pending = [n for n in dict.fromkeys(names)
+               if not (c := _secret_cache.get((n, region))) or now - c[0] >= SECRET_CACHE_TTL]
+    if pending:
+        sm = _sm_client(region)
+        try:
+            kwargs = {"SecretIdList": pending}
+            while True:
+                resp = sm.batch_get_secret_value(**kwargs)
+                for entry in resp.get("SecretValues", []):
+                    val = _secret_payload(entry)
+                    for n in pending:
+                        if n in (entry.get("ARN"), entry.get("Name")):
+                            _secret_cache[(n, region)] = (now, val)
+                if not resp.get("NextToken"):
+                    break
+                kwargs["NextToken"] = resp["NextToken"]
+        except (AttributeError, ClientError):
+            # older botocore, or no secretsmanager:BatchGetSecretValue permission
+            pass
+    return {n: _resolve_secret_value(n, region) for n in names}
+
+def prefetch_api_keys() -> None:
+    """Warm the secret cache for every configured *_SECRET_ARN, one batch call per region."""
+    by_region: dict[str, list[str]] = {}
+    for env_name, region in (
+        ("OPENAI_API_KEY_SECRET_ARN", os.getenv("S3_REGION") or "us-west-2"),
+        ("PINECONE_API_KEY_SECRET_ARN", os.getenv("S3_REGION") or "us-west-2"),
+        ("AWS_BEARER_TOKEN_BEDROCK_SECRET_ARN", os.getenv("BEDROCK_REGION") or "us-west-2"),
+    ):
+        secret_arn = _get_env(env_name)
+        if secret_arn:
+            by_region.setdefault(region, []).append(secret_arn)
+    for region, names in by_region.items():
+        prefetch_secrets(names, region)
+
+@lru_cache(maxsize=16)
+def _secret_field(val: str, *names: str) -> str:
+    """First of `names` found in a JSON secret, else the raw secret string.
+    Memoized on the secret value, so each payload is parsed once."""
+    try:
+        data = json.loads(val)
+    except json.JSONDecodeError:
+        return val
+    if not isinstance(data, dict):
+        return val
+    return next((data[n] for n in names if data.get(n)), val)
+
 def get_openai_api_key() -> str:
     # Prefer secret ARN, fallback to OPENAI_API_KEY env (handy for local tests)
     secret_arn = _get_env("OPENAI_API_KEY_SECRET_ARN")
     if secret_arn:
         val = _resolve_secret_value(secret_arn, region=os.getenv("S3_REGION") or "us-west-2")
-        try:
-            # Secret may be raw string or JSON {"OPENAI_API_KEY":"..."}
-            data = json.loads(val)
-            return data.get("OPENAI_API_KEY") or data.get("openai_api_key") or val
-        except json.JSONDecodeError:
-            return val
+        # Secret may be raw string or JSON {"OPENAI_API_KEY":"..."}
+        return _secret_field(val, "OPENAI_API_KEY", "openai_api_key")
     env_val = _get_env("OPENAI_API_KEY")
     if not env_val:
         raise RuntimeError("OPENAI_API_KEY not set and OPENAI_API_KEY_SECRET_ARN not provided")
     return env_val
 
-@lru_cache(maxsize=4)
 def get_pinecone_api_key() -> str:
     secret_arn = _get_env("PINECONE_API_KEY_SECRET_ARN")
     if secret_arn:
         val = _resolve_secret_value(secret_arn, region=os.getenv("S3_REGION") or "us-west-2")
-        try:
-            data = json.loads(val)
-            return data.get("PINECONE_API_KEY") or data.get("pinecone_api_key") or val
-        except json.JSONDecodeError:
-            return val
+        return _secret_field(val, "PINECONE_API_KEY", "pinecone_api_key")
     env_val = _get_env("PINECONE_API_KEY")
     if not env_val:
         raise RuntimeError("PINECONE_API_KEY not set and PINECONE_API_KEY_SECRET_ARN not provided")
     return env_val
 
-@lru_cache(maxsize=2)
 def get_bedrock_bearer_token() -> str | None:
     secret_arn = _get_env("AWS_BEARER_TOKEN_BEDROCK_SECRET_ARN")
     if not secret_arn:
         return None
     val = _resolve_secret_value(secret_arn, region=os.getenv("BEDROCK_REGION") or "us-west-2")
-    try:
-        data = json.loads(val)
-        return data.get("AWS_BEARER_TOKEN_BEDROCK") or data.get("bedrock_bearer_token") or val
-    except json.JSONDecodeError:
-        return val
+    return _secret_field(val, "AWS_BEARER_TOKEN_BEDROCK", "bedrock_bearer_token")
 
 def get_regions():
     return {
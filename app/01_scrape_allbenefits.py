@@ -1,14 +1,28 @@
 # scrape_benefitscal.py
-import asyncio, re, json, argparse, datetime, tempfile, os, csv, hashlib
+import asyncio, re, argparse, datetime, tempfile, os, csv, hashlib
+from bisect import bisect_right
+from itertools import accumulate
 from urllib.parse import urljoin, urlparse
-from typing import List, Optional, Dict, Tuple
+from typing import List, Optional, Dict, Tuple, Iterable
 from pathlib import Path
 
 from pydantic import BaseModel, Field
 from dateutil.tz import gettz
+
+# Playwright calls inspect.stack() on every API call to label it for tracing,
+# which can eat a quarter of the scraper's CPU. Stub it out unless
+# PW_INSPECT_STACK=1; the tradeoff is less descriptive Playwright error traces.
+if os.getenv("PW_INSPECT_STACK", "0") == "0":
+    import inspect
+    inspect.stack = lambda *a, **k: []
+
 from playwright.async_api import async_playwright, TimeoutError as PWTimeout
 import httpx
-from pdfminer.high_level import extract_text as pdf_extract_text
+try:
+    import pymupdf  # MuPDF text extraction, much faster than pdfminer
+except ImportError:
+    pymupdf = None
+    from pdfminer.high_level import extract_text as pdf_extract_text
 
 NY_TZ = gettz("America/New_York")
 PDF_RE   = re.compile(r"\.pdf($|\?)", re.I)
@@ -23,7 +37,31 @@ RENEW_KWS  = ("renew", "renewal", "recertification", "redetermination")
 DOC_KWS    = ("documents", "required documents", "verification", "proof", "forms")
 CONTACT_KWS= ("contact", "support", "help", "assistance", "office", "customer service")
 
+# Each keyword family as one compiled alternation, searched in lowercased headings
+def kw_re(kws: tuple) -> re.Pattern:
+    return re.compile("|".join(map(re.escape, kws)))
+ELIG_RE    = kw_re(ELIG_KWS)
+BENEFIT_RE = kw_re(BENEFIT_KWS)
+APPLY_RE   = kw_re(APPLY_KWS)
+RENEW_RE   = kw_re(RENEW_KWS)
+CONTACT_RE = kw_re(CONTACT_KWS)
+
+# Text cleanup patterns
+WS_RE       = re.compile(r"\s+")
+SLUG_RE     = re.compile(r"[^a-zA-Z0-9\-]+")
+PARA_RE     = re.compile(r"\n\s*\n")
+HEADING_RE  = re.compile(r"^##[^\n]+\n*")
+PDF_EXT_RE  = re.compile(r"\.pdf(\?.*)?$", re.I)
+DETAILS_RE  = re.compile(r"\s*Details$", re.I)
+STRIP_CHARS = " -*•\u2022\t"
+
+# Resource types never needed for text extraction. Stylesheets are kept: they
+# decide what innerText sees (hidden panels, line breaks).
+BLOCKED_RESOURCES = frozenset({"image", "font", "media"})
+
 # ---------- Data models ----------
+# Section and ChunkRecord are built with model_construct() from values the
+# scraper computes itself, skipping validation on the per-chunk hot path.
 class ContactInfo(BaseModel):
     phones: List[str] = []
     emails: List[str] = []
@@ -74,24 +112,29 @@ def now_iso():
 def sha256_hex(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8", "ignore")).hexdigest()
 
+def stream_checksum(parts: Iterable[str], sep: str = "\n\n") -> str:
+    """sha256_hex(sep.join(parts)) without building the joined string."""
+    h = hashlib.sha256()
+    sep_b = sep.encode("utf-8")
+    for i, p in enumerate(parts):
+        if i: h.update(sep_b)
+        h.update(p.encode("utf-8", "ignore"))
+    return h.hexdigest()
+
 def slugify(s: str, maxlen: int = 50) -> str:
-    s = re.sub(r"[^a-zA-Z0-9\-]+", "-", s.lower()).strip("-")
+    s = SLUG_RE.sub("-", s.lower()).strip("-")
     return s[:maxlen] or "section"
 
 def clean_list(items: List[str]) -> List[str]:
     out, seen = [], set()
     for x in items or []:
-        x = re.sub(r"\s+", " ", x).strip(" -*•\u2022\t")
+        x = WS_RE.sub(" ", x).strip(STRIP_CHARS)
         if not x: continue
         k = x.lower()
         if k not in seen:
             seen.add(k); out.append(x)
     return out
 
-def contains_kw(text: str, kws: tuple) -> bool:
-    t = (text or "").lower()
-    return any(kw in t for kw in kws)
-
 def estimate_tokens(text: str) -> int:
     # crude but stable: ~4 chars per token
     return max(1, int(len(text) / 4))
@@ -103,17 +146,21 @@ def split_markdown_into_chunks(md: str, target_chars: int = 4000, overlap_chars:
     """
     if not md:
         return []
-    paras = [p for p in re.split(r"\n\s*\n", md.strip()) if p.strip()]
+    paras = [p.strip() for p in PARA_RE.split(md.strip()) if p.strip()]
+    # Paragraph cost (text + separator) and its running total, computed once so
+    # each chunk's cut point is a bisect instead of a per-paragraph check
+    lens = [len(p) + 2 for p in paras]
+    prefix = [0, *accumulate(lens)]
+    huge = [n - 2 > target_chars * 1.25 for n in lens]
     chunks = []
     cur = []
     cur_len = 0
-    for p in paras:
-        p_block = p.strip()
-        # if a single paragraph is huge, hard-split by lines
-        if len(p_block) > target_chars * 1.25:
-            lines = p_block.splitlines()
+    i, n = 0, len(paras)
+    while i < n:
+        if huge[i]:
+            # a single huge paragraph is hard-split by lines
             buf, blen = [], 0
-            for ln in lines:
+            for ln in paras[i].splitlines():
                 if blen + len(ln) + 1 > target_chars and buf:
                     chunks.append("\n".join(buf).strip())
                     # overlap from end of buf
@@ -123,25 +170,38 @@ def split_markdown_into_chunks(md: str, target_chars: int = 4000, overlap_chars:
                 blen += len(ln) + 1
             if buf:
                 chunks.append("\n".join(buf).strip())
+            i += 1
             continue
-
-        if cur_len + len(p_block) + 2 <= target_chars:
-            cur.append(p_block)
-            cur_len += len(p_block) + 2
-        else:
+        # take every following normal paragraph that still fits in this chunk
+        j = i
+        while j < n and not huge[j]:
+            j += 1
+        k = max(i, min(bisect_right(prefix, prefix[i] + target_chars - cur_len) - 1, j))
+        cur.extend(paras[i:k])
+        cur_len += prefix[k] - prefix[i]
+        i = k
+        if i < j:
+            # paragraph i does not fit: close the chunk and start the next one
             if cur:
                 chunks.append("\n\n".join(cur).strip())
                 # add overlap: take the last 'overlap_chars' of the chunk
                 last = chunks[-1]
                 overlap = last[-overlap_chars:] if len(last) > overlap_chars else last
                 cur, cur_len = ([overlap], len(overlap))
-            cur.append(p_block)
-            cur_len += len(p_block) + 2
+            cur.append(paras[i])
+            cur_len += lens[i]
+            i += 1
     if cur:
         chunks.append("\n\n".join(cur).strip())
     return [c for c in chunks if c.strip()]
 
 # ---------- Browser helpers ----------
+async def block_unneeded(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
 async def maybe_click_banners(page):
     texts = ["Accept", "I agree", "Got it", "OK", "Close", "Continue"]
     for label in texts:
@@ -151,63 +211,59 @@ async def maybe_click_banners(page):
         except Exception:
             pass
 
+ACCORDION_TOGGLES = [
+    'button[aria-expanded="false"]',
+    '[role="button"][aria-expanded="false"]',
+    'a[aria-expanded="false"]',
+    '.accordion-button.collapsed',
+    '.accordion-header button[aria-expanded="false"]',
+    '[data-toggle="collapse"]',
+    '[data-bs-toggle="collapse"]',
+    '.usa-accordion__button[aria-expanded="false"]',
+    '.mat-expansion-panel-header[aria-expanded="false"]',
+    '.collapsible[aria-expanded="false"]',
+]
+
+# Opens <details> and clicks every matching toggle once, all in-browser;
+# returns how many toggles were clicked
+EXPAND_JS = """(sels) => {
+  document.querySelectorAll('details:not([open])').forEach(d => d.setAttribute('open',''));
+  const seen = new Set();
+  for (const sel of sels) {
+    for (const el of document.querySelectorAll(sel)) {
+      if (seen.has(el)) continue;
+      seen.add(el);
+      try { el.click(); } catch (e) {}
+    }
+  }
+  return seen.size;
+}"""
+
+# True once the number of expanded toggles is the same on two consecutive polls
+EXPANDED_STABLE_JS = """() => {
+  const n = document.querySelectorAll('[aria-expanded="true"]').length;
+  const same = n === window.__expandedCount;
+  window.__expandedCount = n;
+  return same;
+}"""
+
+EXPANDED_COUNT_JS = """() => document.querySelectorAll('[aria-expanded="true"]').length"""
+
 async def expand_all_accordions(page, debug: bool=False, max_passes: int=3) -> int:
     expanded = 0
-    try:
-        await page.evaluate("""() => {
-          document.querySelectorAll('details:not([open])').forEach(d => d.setAttribute('open',''));
-        }""")
-    except Exception:
-        pass
-    toggles = [
-        'button[aria-expanded="false"]',
-        '[role="button"][aria-expanded="false"]',
-        'a[aria-expanded="false"]',
-        '.accordion-button.collapsed',
-        '.accordion-header button[aria-expanded="false"]',
-        '[data-toggle="collapse"]',
-        '[data-bs-toggle="collapse"]',
-        '.usa-accordion__button[aria-expanded="false"]',
-        '.mat-expansion-panel-header[aria-expanded="false"]',
-        '.collapsible[aria-expanded="false"]',
-    ]
     for _ in range(max_passes):
-        changed = 0
-        handles = []
-        for sel in toggles:
-            try:
-                handles += await page.query_selector_all(sel)
-            except Exception:
-                continue
-        # de-dupe by location
-        seen = set(); uniq = []
-        for h in handles:
-            try:
-                box = await h.bounding_box()
-                key = (box['x'] if box else id(h), box['y'] if box else 0)
-            except Exception:
-                key = id(h)
-            if key not in seen:
-                seen.add(key); uniq.append(h)
-        for el in uniq:
+        try:
+            before = await page.evaluate(EXPANDED_COUNT_JS)
+            clicked = await page.evaluate(EXPAND_JS, ACCORDION_TOGGLES)
+            if not clicked:
+                break
             try:
-                await el.scroll_into_view_if_needed()
-                panel_id = await el.get_attribute("aria-controls")
-                await el.click(timeout=1500)
-                try:
-                    await page.wait_for_function(
-                        """(e) => e.getAttribute('aria-expanded')==='true'""", arg=el, timeout=1500
-                    ); changed += 1
-                except Exception:
-                    if panel_id:
-                        try:
-                            await page.wait_for_selector(f"#{panel_id}", state="visible", timeout=1500)
-                            changed += 1
-                        except Exception:
-                            pass
-                await page.wait_for_timeout(100)
+                await page.wait_for_function(EXPANDED_STABLE_JS, polling=100, timeout=1500)
             except Exception:
-                continue
+                pass
+            changed = max(0, await page.evaluate(EXPANDED_COUNT_JS) - before)
+        except Exception:
+            break
         expanded += changed
         if changed == 0:
             break
@@ -216,89 +272,95 @@ async def expand_all_accordions(page, debug: bool=False, max_passes: int=3) -> i
         except Exception: pass
     return expanded
 
-async def extract_text_list(el) -> List[str]:
-    parts: List[str] = []
-    for li in await el.query_selector_all("li"):
-        t = (await li.inner_text() or "").strip()
-        if t: parts.append(t)
-    for p in await el.query_selector_all("p"):
-        t = (await p.inner_text() or "").strip()
-        if t: parts.append(t)
-    for td in await el.query_selector_all("td, th"):
-        t = (await td.inner_text() or "").strip()
-        if t: parts.append(t)
-    if not parts:
-        t = (await el.inner_text() or "").strip()
-        if t: parts = [t]
-    # de-dupe preserve order
-    seen = set(); out = []
-    for s in parts:
-        if s not in seen:
-            seen.add(s); out.append(s)
-    return out
-
-async def scrape_html_sections(page) -> List[Section]:
-    """Return ordered list of Section objects for current page (HTML)."""
+# Snapshot of everything scrape_seed needs from a rendered page, taken in one
+# round-trip once navigation and accordion expansion are done:
+#   title, h1      document title and first <h1> text
+#   sections       [{heading, parts}]; for each sibling until the next heading:
+#                  its li, p and td/th texts (in that order), else its own
+#                  text, de-duped per node
+#   body           whole-page text, only when no heading yielded content
+#   anchors        every link as [href, text], for the support-URL scan
+PAGE_JS = """() => {
+  const isHeading = el => /^H[1-4]$/.test(el.tagName);
+  const text = el => (el.innerText || "").trim();
+  const sections = [];
+  for (const h of document.querySelectorAll("h1, h2, h3, h4")) {
+    const heading = text(h);
+    if (!heading) continue;
+    const parts = [];
+    for (let n = h.nextElementSibling; n && !isHeading(n); n = n.nextElementSibling) {
+      let own = [];
+      for (const sel of ["li", "p", "td, th"]) {
+        n.querySelectorAll(sel).forEach(e => { const t = text(e); if (t) own.push(t); });
+      }
+      if (!own.length) { const t = text(n); if (t) own = [t]; }
+      parts.push(...new Set(own));
+    }
+    sections.push({heading, parts});
+  }
+  const h1 = document.querySelector("h1");
+  const hasContent = sections.some(s => s.parts.length);
+  return {
+    title: document.title || "",
+    h1: h1 ? h1.innerText || "" : null,
+    sections,
+    body: !hasContent && document.body ? document.body.innerText || "" : "",
+    anchors: Array.from(document.querySelectorAll("a[href]"),
+                        a => [a.getAttribute("href"), a.innerText || ""]),
+  };
+}"""
+
+def html_sections(snapshot: Dict) -> List[Section]:
+    """Return ordered list of Section objects from a PAGE_JS snapshot (HTML)."""
     sections: List[Section] = []
-    headings = await page.query_selector_all("h1, h2, h3, h4")
     order = 0
-    for h in headings:
-        title = ((await h.inner_text()) or "").strip()
-        if not title:
-            continue
-        # gather sibling nodes until next heading
-        section_nodes = []
-        node = h
-        while True:
-            nxt_handle = await node.evaluate_handle("el => el.nextElementSibling")
-            nxt_el = nxt_handle.as_element()
-            if not nxt_el: break
-            try:
-                tag_prop = await nxt_el.get_property("tagName")
-                tag = (await tag_prop.json_value() or "").lower()
-            except Exception:
-                break
-            if tag in ("h1","h2","h3","h4"): break
-            section_nodes.append(nxt_el)
-            node = nxt_el
-        texts: List[str] = []
-        for n in section_nodes:
-            texts.extend(await extract_text_list(n))
+    for raw in snapshot["sections"]:
+        title = raw["heading"]
+        texts: List[str] = raw["parts"]
         if texts:
             md_lines = [f"- {ln}" if len(ln) <= 240 else ln for ln in clean_list(texts)]
             sec_md = f"## {title}\n\n" + "\n".join(md_lines)
             order += 1
-            sections.append(Section(section_id=f"{order:03d}-{slugify(title)}",
-                                    heading=title, markdown=sec_md, order=order))
+            sections.append(Section.model_construct(section_id=f"{order:03d}-{slugify(title)}",
+                                                    heading=title, markdown=sec_md, order=order))
     # Fallback: whole body as one section if no headings yielded content
     if not sections:
-        body = await page.query_selector("body")
-        if body:
-            all_text = (await body.inner_text()) or ""
-            lines = [ln.strip() for ln in all_text.splitlines() if ln.strip()]
-            if lines:
-                md_lines = [f"- {ln}" if len(ln) <= 240 else ln for ln in clean_list(lines)]
-                sections.append(Section(section_id="001-page", heading="Page", markdown="## Page\n\n" + "\n".join(md_lines), order=1))
+        lines = [ln.strip() for ln in snapshot["body"].splitlines() if ln.strip()]
+        if lines:
+            md_lines = [f"- {ln}" if len(ln) <= 240 else ln for ln in clean_list(lines)]
+            sections.append(Section.model_construct(section_id="001-page", heading="Page", markdown="## Page\n\n" + "\n".join(md_lines), order=1))
     return sections
 
 # ---------- PDF helper ----------
+def pdf_text(path: str) -> str:
+    if pymupdf is None:
+        return pdf_extract_text(path) or ""
+    with pymupdf.open(path) as doc:
+        return "\n".join(p.get_text("text") for p in doc)
+
 async def pdf_to_sections(url: str) -> List[Section]:
-    async with httpx.AsyncClient(follow_redirects=True, timeout=60) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        ctype = r.headers.get("content-type", "").lower()
-        if "pdf" not in ctype and not PDF_RE.search(url):
-            # Not a PDF; return empty → caller will treat it as HTML instead
-            return []
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tf:
-            tf.write(r.content); tmp_path = tf.name
+    # Stream to disk instead of buffering the whole file in memory; the finally
+    # removes the temp file even when the download itself fails midway
+    tf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    tmp_path = tf.name
     try:
-        text = pdf_extract_text(tmp_path) or ""
+        with tf:
+            async with httpx.AsyncClient(follow_redirects=True, timeout=60) as client:
+                async with client.stream("GET", url) as r:
+                    r.raise_for_status()
+                    ctype = r.headers.get("content-type", "").lower()
+                    if "pdf" not in ctype and not PDF_RE.search(url):
+                        # Not a PDF; return empty → caller will treat it as HTML instead
+                        return []
+                    async for block in r.aiter_bytes():
+                        tf.write(block)
+        # Parse off the event loop so other seeds keep scraping meanwhile
+        text = await asyncio.to_thread(pdf_text, tmp_path)
         lines = [ln.strip() for ln in text.splitlines()]
         lines = [ln for ln in lines if ln]
         md_lines = [f"- {ln}" if len(ln) <= 240 else ln for ln in lines]
         sec_md = "## Document\n\n" + "\n".join(md_lines)
-        return [Section(section_id="001-document", heading="Document", markdown=sec_md, order=1)]
+        return [Section.model_construct(section_id="001-document", heading="Document", markdown=sec_md, order=1)]
     finally:
         try: os.unlink(tmp_path)
         except Exception: pass
@@ -308,13 +370,20 @@ async def scrape_seed(page, url: str, skip_pdf_seeds: bool, debug: bool=False) -
     captured_at = now_iso()
     doc_id = sha256_hex(url)
     # If seed is a PDF and not skipped: extract PDF
+    anchors: List[List[str]] = []
     if PDF_RE.search(url) and not skip_pdf_seeds:
         sections = await pdf_to_sections(url)
         page_title = url.rsplit("/", 1)[-1] or "PDF"
-        program_name = re.sub(r"\.pdf(\?.*)?$", "", page_title, flags=re.I)
+        program_name = PDF_EXT_RE.sub("", page_title)
     else:
         # HTML path
-        await page.goto(url, wait_until="networkidle")
+        # Don't wait for networkidle (analytics beacons can hold it open for the
+        # whole timeout); wait for the first heading the scraper reads instead
+        await page.goto(url, wait_until="domcontentloaded", timeout=20000)
+        try:
+            await page.wait_for_selector("h1, h2, h3, h4", state="attached", timeout=10000)
+        except PWTimeout:
+            pass
         await maybe_click_banners(page)
         await expand_all_accordions(page, debug=debug)
         if debug:
@@ -323,14 +392,14 @@ async def scrape_seed(page, url: str, skip_pdf_seeds: bool, debug: bool=False) -
                 await page.screenshot(path=fname, full_page=True)
             except Exception:
                 pass
-        sections = await scrape_html_sections(page)
+        snapshot = await page.evaluate(PAGE_JS)
+        sections = html_sections(snapshot)
+        anchors = snapshot["anchors"]
         # Titles
-        t = await page.title()
-        page_title = (t or "").strip() or url
+        page_title = snapshot["title"].strip() or url
         # Program name → prefer <h1>
-        p_h1 = await page.query_selector("h1, h1 *")
-        program_name = (await p_h1.inner_text() or "").strip() if p_h1 else page_title
-        program_name = re.sub(r"\s*Details$", "", program_name, flags=re.I).strip()
+        program_name = snapshot["h1"].strip() if snapshot["h1"] is not None else page_title
+        program_name = DETAILS_RE.sub("", program_name).strip()
 
     # Build semi-structured fields from sections
     elig_text = []; bene_text = []; apply_text = []; renew_text = []
@@ -342,27 +411,23 @@ async def scrape_seed(page, url: str, skip_pdf_seeds: bool, debug: bool=False) -
         contact.phones += PHONE_RE.findall(md)
         contact.emails += EMAIL_RE.findall(md)
         # classify section text
-        body_text = re.sub(r"^##[^\n]+\n*", "", md).strip()
-        if contains_kw(hl, ELIG_KWS):   elig_text.append(body_text)
-        if contains_kw(hl, BENEFIT_KWS):bene_text.append(body_text)
-        if contains_kw(hl, APPLY_KWS):  apply_text.append(body_text)
-        if contains_kw(hl, RENEW_KWS):  renew_text.append(body_text)
-        if contains_kw(hl, CONTACT_KWS):
+        body_text = HEADING_RE.sub("", md).strip()
+        if ELIG_RE.search(hl):   elig_text.append(body_text)
+        if BENEFIT_RE.search(hl):bene_text.append(body_text)
+        if APPLY_RE.search(hl):  apply_text.append(body_text)
+        if RENEW_RE.search(hl):  renew_text.append(body_text)
+        if CONTACT_RE.search(hl):
             # keep links that look like support
             pass
 
     # Page-wide anchors that look like support/apply/renew (HTML only)
     support_urls: List[str] = []
-    try:
-        if not PDF_RE.search(url):
-            for a in await page.query_selector_all("a[href]"):
-                href = await a.get_attribute("href")
-                if not href: continue
-                txt = ((await a.inner_text()) or "").lower()
-                if any(k in txt for k in ("contact","office","help","support","apply","renew","find office","forms","download")):
-                    support_urls.append(urljoin(url, href))
-    except Exception:
-        pass
+    if not PDF_RE.search(url):
+        for href, txt in anchors:
+            if not href: continue
+            txt = txt.lower()
+            if any(k in txt for k in ("contact","office","help","support","apply","renew","find office","forms","download")):
+                support_urls.append(urljoin(url, href))
 
     contact = ContactInfo(
         phones=sorted(set(clean_list(contact.phones))),
@@ -371,7 +436,7 @@ async def scrape_seed(page, url: str, skip_pdf_seeds: bool, debug: bool=False) -
     )
 
     # Compute checksum over concatenated section text
-    checksum = sha256_hex("\n\n".join(sec.markdown for sec in sections))
+    checksum = stream_checksum(sec.markdown for sec in sections)
 
     doc = DocRecord(
         doc_id=doc_id,
@@ -399,6 +464,7 @@ async def main():
     ap.add_argument("--headful", action="store_true", help="Run with a visible browser")
     ap.add_argument("--debug", action="store_true", help="Save screenshots + print extra logs")
     ap.add_argument("--skip-pdf-seeds", action="store_true", help="Ignore PDF seeds (do not parse PDFs)")
+    ap.add_argument("--concurrency", type=int, default=4, help="Seeds scraped in parallel (one browser context each)")
 
     # Chunking knobs (tune if you like)
     ap.add_argument("--chunk-target-chars", type=int, default=4000, help="Approx chars per chunk (~1000 tokens)")
@@ -435,18 +501,38 @@ async def main():
             headless=not args.headful,
             args=["--disable-blink-features=AutomationControlled","--no-sandbox"],
         )
-        context = await browser.new_context(
-            user_agent=ua,
-            locale="en-US",
-            timezone_id="America/Los_Angeles",
-            viewport={"width": 1366, "height": 900},
-            ignore_https_errors=True,
-            extra_http_headers={"Accept-Language": "en-US,en;q=0.9"},
-        )
-        await context.add_init_script(
-            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"
-        )
-        page = await context.new_page()
+        # Pool of browser contexts; each worker borrows one per seed
+        contexts: asyncio.Queue = asyncio.Queue()
+        for _ in range(max(1, args.concurrency)):
+            context = await browser.new_context(
+                user_agent=ua,
+                locale="en-US",
+                timezone_id="America/Los_Angeles",
+                viewport={"width": 1366, "height": 900},
+                ignore_https_errors=True,
+                extra_http_headers={"Accept-Language": "en-US,en;q=0.9"},
+            )
+            await context.add_init_script(
+                "Object.defineProperty(navigator, 'webdriver', {get: () => undefined});"
+            )
+            await context.route("**/*", block_unneeded)
+            contexts.put_nowait(context)
+
+        async def scrape_one(url: str) -> DocRecord:
+            context = await contexts.get()
+            try:
+                page = await context.new_page()
+                try:
+                    return await scrape_seed(page, url, skip_pdf_seeds=args.skip_pdf_seeds, debug=args.debug)
+                finally:
+                    try:
+                        await page.close()
+                    except Exception as e:  # crashed page / closed target
+                        print(f"[WARN] closing page for {url}: {e}")
+                    await asyncio.sleep(0.4)  # stay polite to the target site per worker
+            finally:
+                # Always hand the context back, or the remaining workers block on get()
+                contexts.put_nowait(context)
 
         # writers
         docs_f   = open(docs_path, "w", encoding="utf-8")
@@ -460,19 +546,22 @@ async def main():
             if isinstance(s, list): return " | ".join(s)
             return str(s)
 
+        # Scrape concurrently, but write results in seed order as they finish
+        tasks = [asyncio.create_task(scrape_one(url)) for url in seeds]
+
         processed = 0
-        for i, url in enumerate(seeds, 1):
+        for i, (url, task) in enumerate(zip(seeds, tasks), 1):
             try:
-                doc = await scrape_seed(page, url, skip_pdf_seeds=args.skip_pdf_seeds, debug=args.debug)
+                doc = await task
 
                 # Write DOC row
-                docs_f.write(json.dumps(doc.model_dump(), ensure_ascii=False) + "\n")
+                docs_f.write(doc.model_dump_json() + "\n")
 
                 # Make CHUNKS (per section)
                 for sec in doc.sections:
                     md = sec.markdown or ""
                     # Remove heading line from chunk body (keep heading in metadata)
-                    body_md = re.sub(r"^##[^\n]+\n*", "", md).strip()
+                    body_md = HEADING_RE.sub("", md).strip()
                     # If empty, use original
                     if not body_md: body_md = md
                     pieces = split_markdown_into_chunks(body_md,
@@ -480,7 +569,7 @@ async def main():
                                                        overlap_chars=args.chunk_overlap_chars)
                     for idx, piece in enumerate(pieces, 1):
                         chunk_id = f"{doc.doc_id}:{sec.section_id}:{idx:03d}"
-                        rec = ChunkRecord(
+                        rec = ChunkRecord.model_construct(
                             chunk_id=chunk_id,
                             doc_id=doc.doc_id,
                             section_id=sec.section_id,
@@ -491,7 +580,7 @@ async def main():
                             char_count=len(piece),
                             approx_tokens=estimate_tokens(piece),
                         )
-                        chunks_f.write(json.dumps(rec.model_dump(), ensure_ascii=False) + "\n")
+                        chunks_f.write(rec.model_dump_json() + "\n")
 
                 # CSV preview row
                 csv_rows.append({
@@ -510,7 +599,6 @@ async def main():
 
                 processed += 1
                 print(f"[{i}/{len(seeds)}] OK  {doc.program_name}  ({len(doc.sections)} sections)")
-                await asyncio.sleep(0.4)
 
             except Exception as e:
                 print(f"[{i}] ERROR {url}: {e}")
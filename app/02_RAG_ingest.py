@@ -1,26 +1,54 @@
 import os
-import uuid
-from typing import List, Dict, Any
+import codecs
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Iterator
 import boto3
+from botocore.config import Config
 from openai import OpenAI
 from pinecone import Pinecone, ServerlessSpec
+try:
+    import tiktoken
+except ImportError:  # fall back to character windows
+    tiktoken = None
 from app.config import get_openai_api_key, get_regions, get_pinecone_api_key, get_pinecone_config, get_models
 
+@lru_cache(maxsize=4)
+def _encoding(model: str):
+    """Tokenizer for the embedding model (cl100k_base for unknown models)."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+@lru_cache(maxsize=4)
+def _s3_client(region: str):
+    """One S3 client per region for the process, so each ingestor reuses its
+    connection pool and resolved credentials."""
+    return boto3.Session().client(
+        "s3",
+        region_name=region,
+        config=Config(max_pool_connections=64, retries={"max_attempts": 10, "mode": "adaptive"}),
+    )
+
 class RAGIngestor:
     """
     Document ingestion: read S3 (us-west-2), chunk, embed (OpenAI), upsert to Pinecone (us-east-1).
     """
 
-    def __init__(self, index_name: str | None = None, chunk_size: int = 1000):
+    def __init__(self, index_name: str | None = None, chunk_size: int = 1000, chunk_overlap: int = 100):
         self.regions = get_regions()
         self.models = get_models()
         self.pcfg = get_pinecone_config()
 
         self.index_name = index_name or self.pcfg["index_name"]
         self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
 
         # AWS clients in explicit regions
-        self.s3 = boto3.client("s3", region_name=self.regions["s3"])
+        self.s3 = _s3_client(self.regions["s3"])
 
         # OpenAI client (key from Secrets Manager)
         self.openai_client = OpenAI(api_key=get_openai_api_key())
@@ -50,7 +78,40 @@ class RAGIngestor:
         return True
 
     def chunk_text(self, text: str) -> List[str]:
-        return [text[i:i+self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        """Split text into windows of chunk_size tokens overlapping by chunk_overlap
+        (characters instead of tokens when tiktoken is not installed)."""
+        return self.chunk_blocks([text])
+
+    def chunk_blocks(self, blocks: Iterable[str]) -> List[str]:
+        """chunk_text over text that arrives in blocks: each block is tokenized
+        on its own and only the unfinished window is carried over, so the whole
+        text is never assembled in memory."""
+        size = self.chunk_size
+        step = max(1, size - self.chunk_overlap)
+        if tiktoken is None:
+            enc, encode, decode = None, (lambda b: b), (lambda w: w)
+        else:
+            enc = _encoding(self.models["embed_model"])
+            encode = enc.encode
+            # A window edge can split a multi-byte character across tokens; drop
+            # the partial bytes rather than letting decode() insert U+FFFD.
+            decode = lambda w: enc.decode_bytes(w).decode("utf-8", errors="ignore")
+        chunks, buf = [], ("" if enc is None else [])
+        base = start = total = 0  # absolute offsets of buf[0], the next window and the end
+        for block in blocks:
+            toks = encode(block)
+            buf += toks
+            total += len(toks)
+            while start + size <= total and start < total - self.chunk_overlap:
+                chunks.append(decode(buf[start-base:start-base+size]))
+                start += step
+            cut = min(start, total) - base
+            buf, base = buf[cut:], base + cut
+        if total:
+            while start < max(total - self.chunk_overlap, 1):
+                chunks.append(decode(buf[start-base:start-base+size]))
+                start += step
+        return chunks
 
     def embed_text(self, text: str) -> List[float]:
         resp = self.openai_client.embeddings.create(
@@ -59,33 +120,121 @@ class RAGIngestor:
         )
         return resp.data[0].embedding
 
-    def upsert_point(self, id: str, vector: List[float], metadata: Dict[str, Any]):
+    def embed_texts(self, texts: List[str], batch: int = 128) -> List[List[float]]:
+        """Embed many texts with one request per `batch` inputs (order preserved).
+
+        Texts that are identical up to whitespace (repeated boilerplate) are
+        embedded once and share the resulting vector.
+        """
+        keys = [hashlib.sha1(" ".join(t.split()).encode()).hexdigest() for t in texts]
+        unique: Dict[str, str] = {}
+        for k, t in zip(keys, texts):
+            unique.setdefault(k, t)
+        inputs = list(unique.values())
+        out: List[List[float]] = []
+        for i in range(0, len(inputs), batch):
+            resp = self.openai_client.embeddings.create(
+                model=self.models["embed_model"],
+                input=inputs[i:i+batch]
+            )
+            out.extend(d.embedding for d in resp.data)
+        vecs = dict(zip(unique, out))
+        return [vecs[k] for k in keys]
+
+    def _upsert_batch(self, vectors: List[tuple], batch: int = 100, workers: int = 8):
+        """Upsert (id, vector, metadata) triples in requests of up to `batch`, sent in parallel."""
+        if self.index is None:
+            self.index = self.pc.Index(self.index_name)
+        batches = [vectors[i:i+batch] for i in range(0, len(vectors), batch)]
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches)) or 1) as pool:
+            for fut in [pool.submit(self.index.upsert, vectors=b) for b in batches]:
+                fut.result()
+
+    def read_blocks(self, bucket: str, key: str, block: int = 1 << 20) -> Iterator[str]:
+        """Stream an S3 object as UTF-8 text, one decoded block at a time
+        (characters split across blocks are decoded whole)."""
+        stream = self.s3.get_object(Bucket=bucket, Key=key)["Body"]
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        for data in stream.iter_chunks(chunk_size=block):
+            text = decoder.decode(data)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def _stored_ids(self, prefix: str) -> set:
+        """All vector ids in the index starting with `prefix`."""
         if self.index is None:
             self.index = self.pc.Index(self.index_name)
-        self.index.upsert(vectors=[(id, vector, metadata)])
+        return {id_ for page in self.index.list(prefix=prefix) for id_ in page}
+
+    def _delete_ids(self, ids: List[str], batch: int = 1000):
+        for i in range(0, len(ids), batch):
+            self.index.delete(ids=ids[i:i+batch])
+
+    def ingest_object(self, bucket: str, key: str, etag: str = "", force: bool = False,
+                      batch: int = 64, inflight: int = 2) -> tuple[int, int]:
+        """Chunk, embed and upsert one S3 object; returns (chunk count, chunks skipped).
+
+        Vector ids are "<object hash>-<chunk hash>": the chunk hash covers the
+        object's ETag, the chunk index and the chunk text (so also the chunking
+        settings). Chunks already in the index are skipped unless `force`, and
+        the object's vectors that are no longer produced (an older ETag or other
+        chunk settings) are deleted.
+        Chunks are embedded `batch` at a time and each batch is upserted on a
+        background thread while the next one embeds; at most `inflight` batches
+        of vectors wait on Pinecone at once.
+        """
+        chunks = self.chunk_blocks(self.read_blocks(bucket, key))
+        obj_prefix = hashlib.sha256(f"{bucket}/{key}".encode()).hexdigest()[:32] + "-"
+        ids = [obj_prefix + hashlib.sha256(f"{etag}:{i}:{c}".encode()).hexdigest() for i, c in enumerate(chunks)]
+        stored = self._stored_ids(obj_prefix)
+        existing = set() if force else stored
+        todo = [i for i, id_ in enumerate(ids) if id_ not in existing]
+        with ThreadPoolExecutor(max_workers=inflight) as pool:
+            pending = deque()
+            for start in range(0, len(todo), batch):
+                part = todo[start:start+batch]
+                vecs = self.embed_texts([chunks[i] for i in part])
+                pending.append(pool.submit(self._upsert_batch, [
+                    (ids[i], vec, {
+                        "text": chunks[i],
+                        "s3_key": key,
+                        "chunk_index": i,
+                        "total_chunks": len(chunks),
+                    })
+                    for i, vec in zip(part, vecs)
+                ]))
+                if len(pending) >= inflight:
+                    pending.popleft().result()
+            for fut in pending:
+                fut.result()
+        self._delete_ids(sorted(stored - set(ids)))
+        return len(chunks), len(chunks) - len(todo)
 
-    def ingest_from_s3(self, bucket: str, prefix: str = "") -> Dict[str, Any]:
-        stats = {"files_processed": 0, "total_chunks": 0, "errors": []}
+    def ingest_from_s3(self, bucket: str, prefix: str = "", max_workers: int = 8, force: bool = False) -> Dict[str, Any]:
+        stats = {"files_processed": 0, "total_chunks": 0, "chunks_skipped": 0, "errors": []}
         paginator = self.s3.get_paginator('list_objects_v2')
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-            for obj in page.get("Contents", []):
-                key = obj["Key"]
-                if key.endswith("/"):
-                    continue
+        # Files are independent, so run several through S3 -> OpenAI -> Pinecone
+        # at once; results are tallied as each finishes
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {}
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    key = obj["Key"]
+                    if key.endswith("/"):
+                        continue
+                    etag = obj.get("ETag", "").strip('"')
+                    futures[pool.submit(self.ingest_object, bucket, key, etag, force)] = key
+            for fut in as_completed(futures):
+                key = futures[fut]
                 try:
-                    body = self.s3.get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8", errors="ignore")
-                    chunks = self.chunk_text(body)
-                    for i, chunk in enumerate(chunks):
-                        vec = self.embed_text(chunk)
-                        self.upsert_point(str(uuid.uuid4()), vec, {
-                            "text": chunk,
-                            "s3_key": key,
-                            "chunk_index": i,
-                            "total_chunks": len(chunks),
-                        })
+                    n_chunks, n_skipped = fut.result()
                     stats["files_processed"] += 1
-                    stats["total_chunks"] += len(chunks)
-                    print(f"[INGEST] {key} -> {len(chunks)} chunks")
+                    stats["total_chunks"] += n_chunks
+                    stats["chunks_skipped"] += n_skipped
+                    print(f"[INGEST] {key} -> {n_chunks} chunks ({n_skipped} unchanged)")
                 except Exception as e:
                     msg = f"Failed {key}: {e}"
                     print(msg)
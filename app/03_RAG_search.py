@@ -1,7 +1,81 @@
-from typing import List, Dict, Any
-from openai import OpenAI
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+import httpx
+from botocore.exceptions import ClientError
+from openai import OpenAI, AsyncOpenAI, RateLimitError, InternalServerError, APIConnectionError
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 from pinecone import Pinecone
 from app.config import get_openai_api_key, get_pinecone_api_key, get_pinecone_config, get_models
+try:
+    import numpy as np
+except ImportError:  # semantic answer cache is disabled without numpy
+    np = None
+try:
+    from prometheus_client import Counter, Histogram
+except ImportError:  # metrics are no-ops without prometheus_client
+    Counter = Histogram = None
+
+class _NoMetric:
+    """Stand-in for a Histogram / Counter when prometheus_client is missing."""
+
+    def time(self):
+        return nullcontext()
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+# Latency of each external hop, so /metrics shows which of embed / vector
+# search / LLM dominates a request
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+if Histogram is not None:
+    EMBED_LATENCY = Histogram("rag_embed_seconds", "OpenAI embeddings request latency", buckets=LATENCY_BUCKETS)
+    QUERY_LATENCY = Histogram("rag_query_seconds", "Pinecone query latency", buckets=LATENCY_BUCKETS)
+    LLM_LATENCY = Histogram("rag_llm_seconds", "Bedrock converse latency", buckets=LATENCY_BUCKETS)
+    EMBED_CACHE_HITS = Counter("rag_embed_cache_hits", "Queries answered from the embedding cache")
+else:
+    EMBED_LATENCY = QUERY_LATENCY = LLM_LATENCY = EMBED_CACHE_HITS = _NoMetric()
+
+# The embeddings endpoint accepts up to 2048 inputs per request
+EMBED_BATCH_MAX = 2048
+
+# Keep-alive pool shared by every request, so /chat reuses warm TLS connections
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30)
+
+# Bedrock error codes worth retrying (throttling / transient server side)
+RETRYABLE_AWS_CODES = frozenset({
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+    "InternalServerException", "ModelNotReadyException",
+})
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (RateLimitError, InternalServerError, APIConnectionError)):
+        return True
+    return isinstance(exc, ClientError) and exc.response.get("Error", {}).get("Code") in RETRYABLE_AWS_CODES
+
+# Exponential backoff with jitter on throttling and 5xx; other errors raise at once.
+# Works on both sync and async functions.
+retry_transient = retry(
+    retry=retry_if_exception(_is_transient),
+    wait=wait_random_exponential(min=1, max=30),
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
+
+@lru_cache(maxsize=1)
+def _openai_clients() -> tuple:
+    """Process-wide (OpenAI, AsyncOpenAI) clients with pooled connections.
+    SDK retries are off: retry_transient is the only retry layer."""
+    key = get_openai_api_key()
+    return (OpenAI(api_key=key, max_retries=0, http_client=httpx.Client(limits=HTTP_LIMITS)),
+            AsyncOpenAI(api_key=key, max_retries=0, http_client=httpx.AsyncClient(limits=HTTP_LIMITS)))
+
+@lru_cache(maxsize=1)
+def _pinecone_client() -> Pinecone:
+    return Pinecone(api_key=get_pinecone_api_key(), pool_threads=30)
 
 class RAGSearcher:
     """Query embedding and top-k vector search in Pinecone."""
@@ -11,24 +85,89 @@ class RAGSearcher:
         self.models = get_models()
         self.index_name = index_name or self.pcfg["index_name"]
 
-        self.pc = Pinecone(api_key=get_pinecone_api_key())
+        self.pc = _pinecone_client()
         self.index = self.pc.Index(self.index_name)
 
-        self.openai_client = OpenAI(api_key=get_openai_api_key())
+        self.openai_client, self.async_openai_client = _openai_clients()
+
+        # Exact-match LRU cache shared by the sync and async paths: repeated
+        # questions skip the embeddings round-trip
+        self._embed_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._embed_cache_size = 4096
+        self._embed_lock = threading.Lock()
+
+    def _cached_embedding(self, query: str) -> Optional[List[float]]:
+        with self._embed_lock:
+            vec = self._embed_cache.get(query)
+            if vec is not None:
+                self._embed_cache.move_to_end(query)
+                EMBED_CACHE_HITS.inc()
+            return vec
+
+    def _cache_embedding(self, query: str, vec: List[float]) -> None:
+        with self._embed_lock:
+            self._embed_cache[query] = vec
+            if len(self._embed_cache) > self._embed_cache_size:
+                self._embed_cache.popitem(last=False)
+
+    @retry_transient
+    def _create_embeddings(self, inputs):
+        with EMBED_LATENCY.time():
+            return self.openai_client.embeddings.create(
+                model=self.models["embed_model"],
+                input=inputs
+            )
+
+    @retry_transient
+    async def _acreate_embeddings(self, inputs):
+        with EMBED_LATENCY.time():
+            return await self.async_openai_client.embeddings.create(
+                model=self.models["embed_model"],
+                input=inputs
+            )
 
     def embed_query(self, query: str) -> List[float]:
-        resp = self.openai_client.embeddings.create(
-            model=self.models["embed_model"],
-            input=query
-        )
-        return resp.data[0].embedding
+        vec = self._cached_embedding(query)
+        if vec is None:
+            resp = self._create_embeddings(query)
+            vec = resp.data[0].embedding
+            self._cache_embedding(query, vec)
+        return vec
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """embed_query on the async OpenAI client, for use inside async endpoints."""
+        vec = self._cached_embedding(query)
+        if vec is None:
+            resp = await self._acreate_embeddings(query)
+            vec = resp.data[0].embedding
+            self._cache_embedding(query, vec)
+        return vec
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed many queries with one request per EMBED_BATCH_MAX inputs (order preserved)."""
+        out: List[List[float]] = []
+        for i in range(0, len(queries), EMBED_BATCH_MAX):
+            resp = self._create_embeddings(queries[i:i+EMBED_BATCH_MAX])
+            out.extend(d.embedding for d in resp.data)
+        return out
 
     def search_vectors(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        qv = self.embed_query(query)
-        res = self.index.query(vector=qv, top_k=limit, include_metadata=True)
+        return self.query_vector(self.embed_query(query), limit)
+
+    def search_vectors_batch(self, queries: List[str], limit: int = 5, max_workers: int = 16) -> List[List[Dict[str, Any]]]:
+        """search_vectors for many queries: one embeddings request, then the index
+        queries in parallel. Results align with `queries`."""
+        vectors = self.embed_queries(queries)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(vectors)))) as pool:
+            return list(pool.map(lambda qv: self.query_vector(qv, limit), vectors))
+
+    def query_vector(self, qv: List[float], limit: int = 5) -> List[Dict[str, Any]]:
+        with QUERY_LATENCY.time():
+            res = self.index.query(vector=qv, top_k=limit, include_metadata=True)
         out = []
         for m in res.get("matches", []):
             out.append({
+                "id": m["id"],
                 "text": m["metadata"].get("text", ""),
                 "score": m["score"],
                 "s3_key": m["metadata"].get("s3_key", ""),
@@ -36,6 +175,19 @@ class RAGSearcher:
             })
         return out
 
+    def fetch_chunk(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """Stored text and metadata of one indexed chunk, or None if the id is unknown."""
+        vec = self.index.fetch(ids=[chunk_id]).vectors.get(chunk_id)
+        if vec is None:
+            return None
+        meta = vec.metadata or {}
+        return {
+            "id": chunk_id,
+            "text": meta.get("text", ""),
+            "s3_key": meta.get("s3_key", ""),
+            "chunk_index": meta.get("chunk_index", 0),
+        }
+
     def format_context(self, matches: List[Dict[str, Any]]) -> str:
         if not matches:
             return "No relevant context found."
@@ -44,14 +196,91 @@ class RAGSearcher:
             parts.append(f"[Source {i}] (Score: {m['score']:.3f}, File: {m['s3_key']})\n{m['text']}\n")
         return "\n".join(parts)
 
+class SemanticAnswerCache:
+    """
+    Answers keyed by query embedding. get() returns the cached answer of the most
+    similar earlier query when cosine similarity >= threshold, else None; put()
+    stores an answer, overwriting the least recently used entry once full;
+    clear() drops every entry.
+    With quantize=True vectors are kept as int8 plus a per-row scale (4x less
+    memory). Thread-safe; a no-op cache when numpy is not installed.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, quantize: bool = False):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.quantize = quantize
+        self._lock = threading.Lock()
+        self._vectors = None  # (max_entries, dim) float32 (int8 if quantized), rows L2-normalized
+        self._scales = None  # (max_entries,) float32 dequantization scale per row, only when quantized
+        self._answers: List[Any] = []
+        self._last_used: List[int] = []
+        self._clock = 0
+
+    @staticmethod
+    def _unit(vector: List[float]):
+        v = np.asarray(vector, dtype=np.float32)
+        return v / (np.linalg.norm(v) or 1.0)
+
+    def get(self, vector: List[float]) -> Optional[Any]:
+        if np is None or not self._answers:
+            return None
+        v = self._unit(vector)
+        with self._lock:
+            count = len(self._answers)
+            scores = self._vectors[:count] @ v
+            if self.quantize:
+                scores *= self._scales[:count]
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._answers[best]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._answers = []
+            self._last_used = []
+
+    def put(self, vector: List[float], answer: Any) -> None:
+        if np is None:
+            return
+        v = self._unit(vector)
+        with self._lock:
+            self._clock += 1
+            if self._vectors is None:
+                dtype = np.int8 if self.quantize else np.float32
+                self._vectors = np.empty((self.max_entries, v.shape[0]), dtype=dtype)
+                if self.quantize:
+                    self._scales = np.empty(self.max_entries, dtype=np.float32)
+            if len(self._answers) < self.max_entries:
+                slot = len(self._answers)
+                self._answers.append(answer)
+                self._last_used.append(self._clock)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._answers[slot] = answer
+                self._last_used[slot] = self._clock
+            if self.quantize:
+                scale = float(np.abs(v).max()) / 127 or 1.0
+                self._vectors[slot] = np.round(v / scale).astype(np.int8)
+                self._scales[slot] = scale
+            else:
+                self._vectors[slot] = v
+
 # === UI Integration Wrapper ===
+@lru_cache(maxsize=1)
+def _default_searcher() -> RAGSearcher:
+    return RAGSearcher()
+
 def get_rag_response(query: str, conversation_history: list, user_context: dict):
     """Return (response_text, sources, programs) for UI integration.
     - response_text: str
     - sources: list of {name,url,date}
     - programs: list[str]
     """
-    searcher = RAGSearcher()
+    searcher = _default_searcher()
     matches = searcher.search_vectors(query, limit=5)
     context = searcher.format_context(matches)
     # Build a plain text answer using retrieved context (basic scaffold; the service will call Bedrock)
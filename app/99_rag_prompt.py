@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 import argparse, csv, json, sys, time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import List, Dict, Any
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from tenacity import retry, stop_after_attempt, wait_random_exponential
 
 USER_PROMPTS = [
     "Which government programs or benefits am I currently eligible for?",
@@ -24,7 +27,11 @@ DEFAULT_TOP_K = 5
 DEFAULT_TEMPERATURE = 0.7
 TIMEOUT = 60
 RETRIES = 3
-BACKOFF_SEC = 2.0
+
+# One keep-alive session for every call, sized for the concurrent --per-question workers
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
+SESSION.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20))
 
 @dataclass
 class QAResult:
@@ -40,25 +47,37 @@ class QAResult:
 
 def call_ingest(api_url: str, bucket: str, prefix: str):
     url = api_url.rstrip("/") + "/ingest"
-    r = requests.post(url, json={"bucket": bucket, "prefix": prefix}, timeout=TIMEOUT)
+    r = SESSION.post(url, json={"bucket": bucket, "prefix": prefix}, timeout=TIMEOUT)
     return r.status_code == 200, r.text[:200]
 
+@retry(stop=stop_after_attempt(RETRIES), wait=wait_random_exponential(min=1, max=30), reraise=True)
+def post_json(url: str, payload: Dict[str, Any], timeout: float):
+    """POST with jittered exponential backoff; returns (latency_ms, json) of the successful attempt."""
+    t0 = time.time()
+    r = SESSION.post(url, json=payload, timeout=timeout)
+    latency = int((time.time()-t0)*1000)
+    if r.status_code != 200:
+        raise RuntimeError(f"HTTP {r.status_code}: {r.text[:300]}")
+    return latency, r.json()
+
 def call_chat(api_url: str, question: str, top_k: int, temperature: float):
     url = api_url.rstrip("/") + "/chat"
     payload = {"query": question, "top_k": top_k, "temperature": temperature}
-    last_err = None
-    for attempt in range(1, RETRIES+1):
-        t0 = time.time()
-        try:
-            r = requests.post(url, json=payload, timeout=TIMEOUT)
-            latency = int((time.time()-t0)*1000)
-            if r.status_code == 200:
-                return latency, r.json(), None
-            last_err = f"HTTP {r.status_code}: {r.text[:300]}"
-        except Exception as e:
-            last_err = str(e)
-        time.sleep(BACKOFF_SEC * attempt)
-    return 0, None, last_err
+    try:
+        latency, data = post_json(url, payload, TIMEOUT)
+        return latency, data, None
+    except Exception as e:
+        return 0, None, str(e)
+
+def call_chat_batch(api_url: str, questions: List[str], top_k: int):
+    """POST every question to /chat/batch at once; results come back in question order."""
+    url = api_url.rstrip("/") + "/chat/batch"
+    payload = {"messages": questions, "top_k": top_k}
+    try:
+        latency, data = post_json(url, payload, TIMEOUT * len(questions))
+        return latency, data.get("results", []), None
+    except Exception as e:
+        return 0, None, str(e)
 
 def write_csv(results: List[QAResult]):
     with open(OUTPUT_FILE, "w", newline="", encoding="utf-8") as f:
@@ -87,6 +106,10 @@ def main():
     p.add_argument("--temperature", type=float, default=DEFAULT_TEMPERATURE)
     p.add_argument("--ingest-bucket")
     p.add_argument("--ingest-prefix", default="")
+    p.add_argument("--per-question", action="store_true",
+                   help="Call /chat once per question instead of a single /chat/batch request")
+    p.add_argument("--workers", type=int, default=10,
+                   help="Concurrent /chat requests in --per-question mode")
     args = p.parse_args()
 
     questions = USER_PROMPTS
@@ -100,12 +123,34 @@ def main():
         print("[INGEST]", "ok" if ok else f"ERROR: {msg}")
 
     results: List[QAResult] = []
-    for i, q in enumerate(questions, start=1):
-        qid = f"q_{i:04d}"
-        print(f"[ASK] {qid}: {q}")
-        latency, data, err = call_chat(args.api_url, q, args.top_k, args.temperature)
+    if not args.per_question:
+        print(f"[ASK] {len(questions)} questions via /chat/batch")
+        latency, items, err = call_chat_batch(args.api_url, questions, args.top_k)
         ts = datetime.utcnow().isoformat()
+        for i, q in enumerate(questions, start=1):
+            qid = f"q_{i:04d}"
+            data = items[i-1] if items and i <= len(items) else None
+            if data and not err:
+                results.append(QAResult(qid, q, data.get("response"), data.get("sources"),
+                                       None, "ok", None, latency, ts))
+            else:
+                results.append(QAResult(qid, q, None, None, None, "error", err or "missing result", latency, ts))
+        write_csv(results)
+        print(f"✅ DONE → {OUTPUT_FILE}")
+        return
 
+    def ask(i_q):
+        i, q = i_q
+        print(f"[ASK] q_{i:04d}: {q}")
+        latency, data, err = call_chat(args.api_url, q, args.top_k, args.temperature)
+        return latency, data, err, datetime.utcnow().isoformat()
+
+    # Questions run concurrently; map() yields answers back in question order
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        answers = list(pool.map(ask, enumerate(questions, start=1)))
+
+    for i, (q, (latency, data, err, ts)) in enumerate(zip(questions, answers), start=1):
+        qid = f"q_{i:04d}"
         if data and not err:
             results.append(QAResult(qid, q, data.get("answer"), data.get("sources"),
                                    data.get("context_used"), "ok", None, latency, ts))
@@ -1,18 +1,43 @@
 import os
+import json
+import asyncio
 import boto3
+from contextlib import asynccontextmanager
+from botocore.config import Config
 from typing import Optional, List, Dict, Any
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from app.02_RAG_ingest import RAGIngestor  # align to app file names
-from app.03_RAG_search import RAGSearcher, get_rag_response
-from app.00_config import get_regions, get_models, get_bedrock_bearer_token
+from app.03_RAG_search import RAGSearcher, SemanticAnswerCache, get_rag_response, retry_transient, LLM_LATENCY
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+except ImportError:  # /metrics answers 404 without prometheus_client
+    generate_latest = None
+from app.00_config import get_regions, get_models, prefetch_api_keys
+
+# One batched Secrets Manager round-trip for all API keys before anything needs them
+prefetch_api_keys()
 
 regions = get_regions()
 models = get_models()
 
-app = FastAPI(title="BenefitsFlow RAG API", version="2.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the Bedrock client once per worker at startup (not per import) and
+    share it, with its connection pool, across every request."""
+    app.state.bedrock = boto3.Session().client(
+        "bedrock-runtime",
+        region_name=regions["bedrock"],
+        # botocore retries off: converse/converse_stream retry via retry_transient
+        config=Config(max_pool_connections=100, retries={"max_attempts": 1}),
+    )
+    yield
+    app.state.bedrock.close()
+
+app = FastAPI(title="BenefitsFlow RAG API", version="2.0.0", lifespan=lifespan)
 
 # Enable broad CORS so the HTML UI can call the API locally or via ALB
 app.add_middleware(
@@ -23,14 +48,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Bedrock client in us-west-2
-bedrock = boto3.client("bedrock-runtime", region_name=regions["bedrock"])
+# Prompt pieces shared by every Bedrock call (built once, never mutated)
+SYSTEM_PROMPT = "You are a concise, helpful social worker assistant providing assistance to users who have lost their job in California at a 5th-grade reading level. Use empathetic language in your response."
+SYSTEM_MESSAGE = [{"text": SYSTEM_PROMPT}]
+USER_PROMPT = "Context:\n{ctx}\n\nQuestion: {q}\n\nAnswer:".format
+INFERENCE_CONFIG = {"maxTokens": 600, "temperature": 0.5}
+
+# Max questions of one /chat/batch request in flight at once
+BATCH_CONCURRENCY = 20
+
+def get_bedrock(request: Request):
+    """Shared Bedrock runtime client (us-west-2) created in `lifespan`."""
+    return request.app.state.bedrock
 
 # Schemas expected by the UI backend
 class IngestRequest(BaseModel):
     bucket: str
     prefix: Optional[str] = ""
 
+class IngestResponse(BaseModel):
+    status: str
+    statistics: Dict[str, Any]
+
 class ChatRequest(BaseModel):
     message: str
     situation: Optional[str] = None
@@ -41,58 +80,172 @@ class ChatResponse(BaseModel):
     sources: List[Dict[str, str]] = []
     programs: List[str] = []
 
+class BatchChatRequest(BaseModel):
+    messages: List[str]
+    top_k: int = 5
+
+class BatchChatResponse(BaseModel):
+    results: List[ChatResponse]
+
 # Instantiate components
 ingestor = RAGIngestor()
 searcher = RAGSearcher()
 
+# Near-duplicate questions reuse an earlier answer instead of calling Pinecone + Bedrock.
+# Opt-in because answers are keyed on the question alone; /ingest clears it
+if os.getenv("RAG_ANSWER_CACHE") == "1":
+    answer_cache = SemanticAnswerCache(threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")), quantize=True)
+else:
+    answer_cache = None
+
 @app.post("/ingest")
-def ingest(request: IngestRequest):
+async def ingest(request: IngestRequest) -> IngestResponse:
     try:
-        ingestor.create_index()
-        stats = ingestor.ingest_from_s3(request.bucket, request.prefix or "")
-        return {"status": "success", "statistics": stats}
+        # Long blocking job: run it on a worker thread so the event loop keeps serving /chat
+        await asyncio.to_thread(ingestor.create_index)
+        stats = await asyncio.to_thread(ingestor.ingest_from_s3, request.bucket, request.prefix or "")
+        return IngestResponse(status="success", statistics=stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Cached answers were built from the old documents
+        if answer_cache is not None:
+            answer_cache.clear()
+
+@retry_transient
+def converse(bedrock, **kwargs):
+    """bedrock.converse, retried with backoff when Bedrock throttles."""
+    with LLM_LATENCY.time():
+        return bedrock.converse(**kwargs)
+
+@retry_transient
+def converse_stream(bedrock, **kwargs):
+    """bedrock.converse_stream, retried with backoff when Bedrock throttles
+    (latency is time to the start of the stream)."""
+    with LLM_LATENCY.time():
+        return bedrock.converse_stream(**kwargs)
+
+def converse_request(message: str, matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Bedrock Converse arguments asking the model to answer `message` from `matches`."""
+    user_prompt = USER_PROMPT(ctx=searcher.format_context(matches), q=message)
+
+    return dict(
+        modelId=models["llm_model"],
+        messages=[{"role": "user", "content": [{"text": user_prompt}]}],
+        inferenceConfig=INFERENCE_CONFIG,
+        system=SYSTEM_MESSAGE,
+    )
+
+def ui_sources(matches: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Convert search matches to the UI's source shape."""
+    srcs = []
+    for m in matches:
+        name = m.get("s3_key","")
+        # "id" lets the UI load the full chunk text on demand from /source/{id}
+        srcs.append({"name": name or "S3 Document", "url": "", "date": "", "id": m.get("id", "")})
+    return srcs
+
+def answer_with_context(bedrock, message: str, matches: List[Dict[str, Any]]) -> ChatResponse:
+    """Ask Bedrock to answer `message` from the retrieved matches, in the UI's /chat shape."""
+    # Invoke Bedrock GPT-OSS
+    response = converse(bedrock, **converse_request(message, matches))
+
+    text = response["output"]["message"]["content"][0]["text"] if "output" in response else ""
+
+    # Programs placeholder (integration point for BenefitsFlow specific outputs)
+    programs: List[str] = []
+
+    return ChatResponse(response=text, sources=ui_sources(matches), programs=programs)
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest, bedrock=Depends(get_bedrock)) -> ChatResponse:
     """Match UI's expected /chat contract and return {response, sources, programs}."""
     try:
-        # Retrieve context with our searcher
-        matches = searcher.search_vectors(request.message, limit=5)
-        context = searcher.format_context(matches)
+        qv = await searcher.aembed_query(request.message)
+        cached = answer_cache.get(qv) if answer_cache is not None else None
+        if cached is not None:
+            return cached
+
+        # Retrieve context with our searcher (Pinecone and boto3 clients are
+        # blocking, so they run on worker threads)
+        matches = await asyncio.to_thread(searcher.query_vector, qv, 5)
+        answer = await asyncio.to_thread(answer_with_context, bedrock, request.message, matches)
+        if answer_cache is not None:
+            answer_cache.put(qv, answer)
+        return answer
 
-        # Compose prompt
-        system_prompt = "You are a concise, helpful social worker assistant providing assistance to users who have lost their job in California at a 5th-grade reading level. Use empathetic language in your response."
-        user_prompt = f"Context:\n{context}\n\nQuestion: {request.message}\n\nAnswer:"
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Optional bearer token header placeholder (if used)
-        bearer = get_bedrock_bearer_token()
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, bedrock=Depends(get_bedrock)):
+    """Same as /chat, streamed as server-sent events: one {"delta": text} event per
+    Bedrock token chunk, then a final "done" event carrying {sources, programs}."""
+    try:
+        qv = await searcher.aembed_query(request.message)
+        matches = await asyncio.to_thread(searcher.query_vector, qv, 5)
+        response = await asyncio.to_thread(converse_stream, bedrock, **converse_request(request.message, matches))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Invoke Bedrock GPT-OSS
-        response = bedrock.converse(
-            modelId=models["llm_model"],
-            messages=[{"role": "user", "content": [{"text": user_prompt}]}],
-            inferenceConfig={"maxTokens": 600, "temperature": 0.5},
-            system=[{"text": system_prompt}],
-        )
+    def events():
+        # Sync generator over the boto3 event stream; Starlette iterates it on a worker thread
+        for event in response["stream"]:
+            delta = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+            if delta:
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+        done = {"sources": ui_sources(matches), "programs": []}
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
 
-        text = response["output"]["message"]["content"][0]["text"] if "output" in response else ""
+    return StreamingResponse(events(), media_type="text/event-stream")
 
-        # Convert sources to UI shape
-        srcs = []
-        for m in matches:
-            name = m.get("s3_key","")
-            srcs.append({"name": name or "S3 Document", "url": "", "date": ""})
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest, bedrock=Depends(get_bedrock)) -> BatchChatResponse:
+    """Answer several questions, embedding them all in one request; results align with `messages`."""
+    try:
+        all_matches = await asyncio.to_thread(
+            searcher.search_vectors_batch, request.messages, request.top_k, BATCH_CONCURRENCY)
+        # Questions are independent: answer them concurrently, capped so a
+        # large batch stays under the Bedrock rate limits
+        limit = asyncio.Semaphore(BATCH_CONCURRENCY)
 
-        # Programs placeholder (integration point for BenefitsFlow specific outputs)
-        programs: List[str] = []
+        async def answer_one(msg: str, matches: List[Dict[str, Any]]) -> ChatResponse:
+            async with limit:
+                return await asyncio.to_thread(answer_with_context, bedrock, msg, matches)
 
-        return ChatResponse(response=text, sources=srcs, programs=programs)
+        results = await asyncio.gather(*(answer_one(m, ms) for m, ms in zip(request.messages, all_matches)))
+        return BatchChatResponse(results=list(results))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class SourceChunk(BaseModel):
+    id: str
+    text: str
+    s3_key: str
+    chunk_index: int
+
+@app.get("/source/{chunk_id}")
+async def get_source(chunk_id: str) -> SourceChunk:
+    """Full text of one retrieved chunk, fetched lazily instead of riding on every /chat response."""
+    chunk = await asyncio.to_thread(searcher.fetch_chunk, chunk_id)
+    if chunk is None:
+        raise HTTPException(status_code=404, detail="Unknown source id")
+    return SourceChunk(**chunk)
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus scrape endpoint (embed / query / LLM latency histograms, cache hits)."""
+    if generate_latest is None:
+        raise HTTPException(status_code=404, detail="prometheus_client not installed")
+    registry = REGISTRY
+    # Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR;
+    # aggregate them so a scrape sees the whole pod, not one worker
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
-def health():
+def health() -> Dict[str, Any]:
     return {"service": "ok", "regions": regions, "model": models["llm_model"]}
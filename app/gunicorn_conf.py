@@ -0,0 +1,23 @@
+"""Gunicorn settings for the RAG API (see Dockerfile.api).
+
+Run with: gunicorn -c app/gunicorn_conf.py app.RAG_service:app
+"""
+import os
+import multiprocessing
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# 2 x CPU + 1 async workers (override with WEB_CONCURRENCY)
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+keepalive = 30
+timeout = 120
+
+# No preload_app: RAG_service opens Secrets Manager, Pinecone and OpenAI
+# connections at import, and forked workers must not share those sockets
+
+def child_exit(server, worker):
+    """Drop a dead worker's Prometheus samples (multiprocess mode only)."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)